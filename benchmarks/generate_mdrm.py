@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Synthetic MDRM Generator
+
+This script writes an MDRM_CSV.csv look-alike of any size, so the benchmarks
+can run without the real file. It keeps the shape of the real manual: a few
+mnemonics (like RCON) hold most of the items, identifiers have one to three
+dated versions, about half of the items are still active (9999-12-31), and
+descriptions contain quoted line breaks.
+
+    python benchmarks/generate_mdrm.py 1000000 -o /tmp/MDRM_CSV.csv
+"""
+
+import argparse
+import calendar
+
+import numpy as np
+import pandas as pd
+
+WORDS = ('total assets liabilities allowance for loan and lease losses deposits capital risk based '
+         'interest income expense securities trading held maturity available sale domestic foreign '
+         'offices consolidated subsidiaries reported schedule memoranda noninterest bearing '
+         'other real estate secured by commercial industrial loans unused commitments').split()
+
+ITEM_TYPES = list('FDPRSJ')
+ITEM_TYPE_WEIGHTS = [0.55, 0.25, 0.05, 0.05, 0.05, 0.05]
+
+# Distinct names and descriptions sampled from (rows share them, as in the real manual)
+TEXT_POOL_SIZE = 20000
+
+OPEN_END_DATE = '12/31/9999 12:00:00 AM'
+
+
+def letters(values, width=4):
+    """Spell non-negative integers as fixed-width uppercase strings (base 26)."""
+    chars = np.empty((len(values), width), dtype='U1')
+    for position in range(width - 1, -1, -1):
+        chars[:, position] = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))[values % 26]
+        values = values // 26
+    return np.array([''.join(row) for row in chars])
+
+
+def sentences(rng, n, n_words):
+    """Return n random sentences of n_words vocabulary words."""
+    words = np.array(WORDS)[rng.integers(0, len(WORDS), (n, n_words))]
+    return np.array([' '.join(row) for row in words], dtype=object)
+
+
+def format_dates(months, month_end=False):
+    """Format month offsets from January 1950 as MDRM CSV dates (first or last day of the month)."""
+    codes, uniques = pd.factorize(months)
+    text = []
+    for offset in uniques:
+        year, month = 1950 + int(offset) // 12, int(offset) % 12 + 1
+        day = calendar.monthrange(year, month)[1] if month_end else 1
+        text.append(f"{month}/{day}/{year} 12:00:00 AM")
+    return np.array(text, dtype=object)[codes]
+
+
+def generate_mdrm(n_rows, seed=0):
+    """Return a synthetic MDRM DataFrame with n_rows rows, in the CSV's column order."""
+    rng = np.random.default_rng(seed)
+
+    # Mnemonics with a skewed size distribution, each belonging to one form
+    n_mnemonics = max(20, n_rows // 100)
+    mnemonics = letters(rng.choice(26 ** 4, n_mnemonics, replace=False))
+    mnemonics[:3] = ['RCON', 'BHCK', 'RIAD']
+    weights = 1.0 / np.arange(1, n_mnemonics + 1) ** 1.1
+    forms = np.array([f'FR {1000 + i}' for i in range(max(5, n_mnemonics // 5))], dtype=object)
+    forms[:3] = ['FFIEC 031', 'FR Y-9C', 'FFIEC 041']
+    mnemonic_forms = forms[rng.integers(0, len(forms), n_mnemonics)]
+    mnemonic_forms[:3] = forms[:3]
+    glossaries = 'Series glossary for the report series. ' + sentences(rng, n_mnemonics, 40)
+
+    # Identifiers with one to three versions each
+    versions = rng.choice([1, 2, 3], size=n_rows, p=[0.75, 0.2, 0.05])
+    versions = versions[:np.searchsorted(np.cumsum(versions), n_rows) + 1]
+    versions[-1] -= versions.sum() - n_rows
+    id_mnemonics = rng.choice(n_mnemonics, len(versions), p=weights / weights.sum())
+    item_codes = pd.Series(rng.integers(0, 10000, len(versions))).astype(str).str.zfill(4).to_numpy()
+    lettered = rng.random(len(versions)) < 0.05
+    item_codes[lettered] = ['J' + code[1:] for code in item_codes[lettered]]
+    names = np.array([name.upper() for name in sentences(rng, TEXT_POOL_SIZE, 4)], dtype=object)
+    id_names = rng.integers(0, TEXT_POOL_SIZE, len(versions))
+
+    # Expand to one row per version with back-to-back validity windows (whole months,
+    # so there are only a few thousand distinct dates, as in the real file)
+    id_rows = np.repeat(np.arange(len(versions)), versions)
+    first_rows = np.cumsum(versions) - versions
+    last = np.zeros(n_rows, dtype=bool)
+    last[np.cumsum(versions) - 1] = True
+    spans = rng.integers(12, 120, n_rows)
+    elapsed = np.cumsum(spans) - spans
+    starts = rng.integers(0, 840, len(versions))[id_rows] + elapsed - elapsed[first_rows][id_rows]
+    start_text = format_dates(starts)
+    end_text = format_dates(starts + spans - 1, month_end=True)
+    end_text[last & (rng.random(n_rows) < 0.6)] = OPEN_END_DATE
+
+    descriptions = sentences(rng, TEXT_POOL_SIZE, 30)
+    descriptions[::3] += '\nReport this item in thousands of dollars.'
+    m = id_mnemonics[id_rows]
+    return pd.DataFrame({
+        'Mnemonic': mnemonics[m],
+        'Item Code': item_codes[id_rows],
+        'Start Date': start_text,
+        'End Date': end_text,
+        'Item Name': names[id_names[id_rows]],
+        'Confidentiality': rng.choice(['Y', 'N'], n_rows, p=[0.55, 0.45]),
+        'ItemType': rng.choice(ITEM_TYPES, n_rows, p=ITEM_TYPE_WEIGHTS),
+        'Reporting Form': mnemonic_forms[m],
+        'Description': descriptions[rng.integers(0, TEXT_POOL_SIZE, n_rows)],
+        'SeriesGlossary': glossaries[m],
+    })
+
+
+def write_mdrm_csv(df, path):
+    """Write a DataFrame in the MDRM_CSV.csv layout (with the leading PUBLIC line)."""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write('PUBLIC\n')
+        df.to_csv(f, index=False, chunksize=100000)
+
+
+def main():
+    """Generate a synthetic MDRM CSV."""
+    parser = argparse.ArgumentParser(description="Write a synthetic MDRM_CSV.csv")
+    parser.add_argument('rows', type=int, nargs='?', default=87000)
+    parser.add_argument('-o', '--output', default='MDRM_CSV.csv')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    write_mdrm_csv(generate_mdrm(args.rows, args.seed), args.output)
+    print(f"Wrote {args.rows} synthetic rows to '{args.output}'")
+
+
+if __name__ == '__main__':
+    main()
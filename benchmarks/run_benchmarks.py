@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+MDRM Benchmarks
+
+This script times the hot paths of the explorer and the analysis script on a
+synthetic MDRM file: CSV parsing, cached loads, dataset startup, explorer
+searches and table sorting/filtering, item detail lookups, identifier
+validation, the full analysis run, and the startup of the entry points
+(module imports and a single-question CLI run). Each benchmark runs in a fresh
+process, so its latency percentiles and peak memory are not skewed by the
+others. Results are compared with a stored baseline, and the script exits with
+status 1 when a benchmark got slower or bigger than the threshold allows, or
+when an import exceeds its absolute time budget.
+
+    python benchmarks/run_benchmarks.py --save-baseline     # record a baseline
+    python benchmarks/run_benchmarks.py                     # compare with it
+    python benchmarks/run_benchmarks.py --rows 10000000 --only load_csv filter
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from generate_mdrm import generate_mdrm, write_mdrm_csv
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+# Allowed slowdown (or memory growth) over the baseline before failing
+DEFAULT_THRESHOLD = 0.25
+
+PERCENTILES = [50, 95, 99]
+
+# Timed runs of the whole-file benchmarks and queries per query benchmark
+LOAD_REPEAT = 3
+QUERY_REPEAT = 200
+
+# Identifiers per validation run
+VALIDATE_IDS = 1000000
+
+# Fresh interpreters started per import benchmark
+IMPORT_REPEAT = 10
+
+# Absolute p50 budgets in ms, checked on every run: importing the entry points
+# (interpreter startup included) must stay near-instant, so it may not pull in
+# pandas, matplotlib, dash or the data
+BUDGETS_MS = {'import_analysis': 250, 'import_explorer': 250}
+
+BENCHMARKS = {}
+
+
+def benchmark(func):
+    """Register a benchmark function, named without its bench_ prefix."""
+    BENCHMARKS[func.__name__[len('bench_'):]] = func
+    return func
+
+
+def timed(func, repeat):
+    """Call func repeat times and return the wall-clock seconds of each call."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def timed_python(args, repeat):
+    """Run Python with args in a fresh interpreter repeat times and return the seconds of each run."""
+    command = [sys.executable] + args
+    return timed(lambda: subprocess.run(command, cwd=REPO_DIR, check=True, stdout=subprocess.DEVNULL),
+                 repeat)
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the progress messages printed by the code under test."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def explorer():
+    """Create the explorer app (which loads the dataset and builds its indexes).
+
+    Returns the explorer module and the app's dataset snapshot.
+    """
+    with quiet():
+        import mdrm_explorer
+        app = mdrm_explorer.create_app()
+    return mdrm_explorer, app.state.dataset
+
+
+def search_mix(df, rng, n):
+    """Return n explorer search criteria drawn from a realistic mix of filters."""
+    mnemonics = df['Mnemonic'].astype(str).to_numpy()
+    forms = df['Reporting Form'].dropna().astype(str).to_numpy()
+    item_codes = df['Item Code'].dropna().astype(str).to_numpy()
+    names = df['Item Name'].dropna().astype(str).to_numpy()
+    dates = ['2000-03-31', '2010-12-31', '2019-03-31', '2024-06-30']
+
+    def pick(values):
+        return values[rng.integers(len(values))]
+
+    def name_words():
+        words = pick(names).lower().split()
+        return ' '.join(words[:rng.integers(1, 3)])
+
+    mix = [
+        lambda: {'mnemonic': pick(mnemonics)},
+        lambda: {'reporting_form': pick(forms)},
+        lambda: {'item_code': pick(item_codes)[:rng.integers(2, 5)]},
+        lambda: {'mnemonic': pick(mnemonics), 'item_type': 'F'},
+        lambda: {'confidentiality': 'N'},
+        lambda: {'reporting_form': pick(forms), 'confidentiality': 'Y', 'item_type': 'D'},
+        lambda: {'text': name_words()},
+        lambda: {'mnemonic': pick(mnemonics), 'text': name_words()},
+        lambda: {'reporting_form': pick(forms), 'as_of': pick(dates)},
+        lambda: {'item_code': pick(item_codes), 'as_of': pick(dates)},
+    ]
+    keys = ['mnemonic', 'item_code', 'item_type', 'reporting_form', 'confidentiality', 'text', 'as_of']
+    return [dict(dict.fromkeys(keys), **mix[i % len(mix)]()) for i in range(n)]
+
+
+@benchmark
+def bench_import_analysis(csv_path, cache_dir):
+    """Import mdrm_analysis in a fresh interpreter (as CLI runs and tests do)."""
+    return timed_python(['-c', 'import mdrm_analysis'], IMPORT_REPEAT)
+
+
+@benchmark
+def bench_import_explorer(csv_path, cache_dir):
+    """Import mdrm_explorer in a fresh interpreter (without creating the app)."""
+    return timed_python(['-c', 'import mdrm_explorer'], IMPORT_REPEAT)
+
+
+@benchmark
+def bench_cli_as_of(csv_path, cache_dir):
+    """Answer one point-in-time question with the analysis CLI, from process start to exit."""
+    return timed_python(['mdrm_analysis.py', '--as-of', '2019-03-31'], LOAD_REPEAT)
+
+
+@benchmark
+def bench_load_csv(csv_path, cache_dir):
+    """Parse the CSV without the columnar cache."""
+    from mdrm_data import read_csv
+    return timed(lambda: read_csv(csv_path), LOAD_REPEAT)
+
+
+@benchmark
+def bench_load_cache(csv_path, cache_dir):
+    """Load the DataFrame from the columnar cache."""
+    from mdrm_data import load_mdrm
+    with quiet():
+        return timed(lambda: load_mdrm(csv_path, cache_dir), LOAD_REPEAT)
+
+
+@benchmark
+def bench_startup(csv_path, cache_dir):
+    """Build the explorer's dataset snapshot (indexes) from a loaded DataFrame."""
+    from mdrm_data import load_mdrm
+    from mdrm_dataset import MDRMDataset
+    with quiet():
+        df = load_mdrm(csv_path, cache_dir)
+        return timed(lambda: MDRMDataset(df, list(df.columns[:8]), cache_dir), LOAD_REPEAT)
+
+
+@benchmark
+def bench_filter(csv_path, cache_dir):
+    """Run explorer searches (first result page) with the result cache cleared."""
+    explorer_module, data = explorer()
+    queries = iter(search_mix(data.df, np.random.default_rng(0), QUERY_REPEAT))
+
+    def search():
+        explorer_module.result_rows.cache_clear()
+        explorer_module.table_page(data, next(queries), 0, 10, None, None)
+    return timed(search, QUERY_REPEAT)
+
+
+@benchmark
+def bench_table(csv_path, cache_dir):
+    """Sort and filter search results in the table with the result cache cleared."""
+    explorer_module, data = explorer()
+    rng = np.random.default_rng(0)
+    queries = iter(search_mix(data.df, rng, QUERY_REPEAT))
+    filters = ['', '{Item Name} contains "TOTAL"', '{Confidentiality} = "N"', '{Start Date} > "2000-01-01"']
+
+    def search():
+        explorer_module.result_rows.cache_clear()
+        columns = explorer_module.TABLE_COLUMNS
+        sort_by = [{'column_id': columns[rng.integers(len(columns))], 'direction': ['asc', 'desc'][rng.integers(2)]}]
+        explorer_module.table_page(data, next(queries), int(rng.integers(3)), 10, sort_by,
+                                   filters[rng.integers(len(filters))])
+    return timed(search, QUERY_REPEAT)
+
+
+@benchmark
+def bench_details(csv_path, cache_dir):
+    """Render the item details panel for random identifiers."""
+    explorer_module, data = explorer()
+    df = data.df
+    rows = np.random.default_rng(0).integers(0, len(df), QUERY_REPEAT)
+    cells = iter([{'Mnemonic': df['Mnemonic'].iloc[r], 'Item Code': df['Item Code'].iloc[r]} for r in rows])
+    return timed(lambda: explorer_module.item_details(data, {'row': 0}, [next(cells)]), QUERY_REPEAT)
+
+
+@benchmark
+def bench_related(csv_path, cache_dir):
+    """List the top related series of random Mnemonics and Reporting Forms."""
+    explorer_module, data = explorer()
+    rng = np.random.default_rng(0)
+    kinds = rng.choice(['mnemonic', 'form'], QUERY_REPEAT)
+    names = iter([data.graph.graphs[kind].series[rng.integers(len(data.graph.graphs[kind].series))]
+                  for kind in kinds])
+    kinds = iter(kinds)
+    return timed(lambda: explorer_module.related_series(data, next(kinds), next(names), 'shared'),
+                 QUERY_REPEAT)
+
+
+@benchmark
+def bench_typeahead(csv_path, cache_dir):
+    """Complete random one- to four-character prefixes of every typeahead field."""
+    explorer_module, data = explorer()
+    rng = np.random.default_rng(0)
+    fields = list(data.typeahead.fields)
+    queries = []
+    for i in range(QUERY_REPEAT):
+        field = fields[i % len(fields)]
+        values = data.typeahead.fields[field].values
+        value = str(values[rng.integers(len(values))])
+        queries.append((field, value[:rng.integers(1, 5)]))
+    queries = iter(queries)
+    return timed(lambda: explorer_module.completions(data, *next(queries)), QUERY_REPEAT)
+
+
+@benchmark
+def bench_validate(csv_path, cache_dir):
+    """Validate a stream of identifiers (one timing per VALIDATE_IDS ids)."""
+    from mdrm_data import load_mdrm
+    from mdrm_validate import IdentifierTable, validate_stream
+    with quiet():
+        df = load_mdrm(csv_path, cache_dir)
+    table = IdentifierTable(df)
+    ids = (df['Mnemonic'].astype(str) + df['Item Code'].astype(str)).to_numpy()
+    ids = ids[np.random.default_rng(0).integers(0, len(ids), VALIDATE_IDS)]
+    data = ('\n'.join(ids) + '\n').encode()
+    return timed(lambda: validate_stream(table, io.BytesIO(data), io.BytesIO(), '2019-03-31', ['F']),
+                 LOAD_REPEAT)
+
+
+@benchmark
+def bench_analysis(csv_path, cache_dir):
+    """Run mdrm_analysis.main() end to end (charts rendered inline, then reused from the chart cache)."""
+    import mdrm_analysis
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        sys.argv = ['mdrm_analysis.py', '--workers', '1']
+        with quiet():
+            mdrm_analysis.main()
+            return timed(mdrm_analysis.main, LOAD_REPEAT)
+
+
+def prepare_caches(csv_path, cache_dir):
+    """Write the columnar and search index caches, so no benchmark pays for building them."""
+    from mdrm_data import load_mdrm
+    from mdrm_dataset import MDRMDataset
+    with quiet():
+        df = load_mdrm(csv_path, cache_dir)
+        MDRMDataset(df, list(df.columns[:8]), cache_dir)
+
+
+def run_worker(name, csv_path, cache_dir, result_path):
+    """Run one benchmark in this process and write its timings and peak memory."""
+    if name == 'prepare':
+        prepare_caches(csv_path, cache_dir)
+        return
+    times = BENCHMARKS[name](csv_path, cache_dir)
+    # ru_maxrss is in kilobytes on Linux; benchmarks that time fresh
+    # interpreters report the largest of them
+    peak_kb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    peak_mb = peak_kb / 1024
+    with open(result_path, 'w') as f:
+        json.dump({'times': times, 'peak_rss_mb': peak_mb}, f)
+
+
+def summarize(times, peak_mb):
+    """Return latency percentiles (ms) and peak memory for one benchmark."""
+    ms = np.array(times) * 1000
+    summary = {f'p{p}': float(np.percentile(ms, p)) for p in PERCENTILES}
+    summary.update(mean=float(ms.mean()), n=len(ms), peak_rss_mb=peak_mb)
+    return summary
+
+
+def run_worker_process(name, csv_path, cache_dir, result_path):
+    """Run the worker for one benchmark (or 'prepare') in a fresh process."""
+    env = dict(os.environ, MDRM_CSV=csv_path, MDRM_CACHE_DIR=cache_dir, MDRM_RELOAD_INTERVAL='0')
+    subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', name,
+                    '--csv', csv_path, '--cache-dir', cache_dir, '--result', result_path],
+                   env=env, cwd=REPO_DIR, check=True, stdout=subprocess.DEVNULL)
+
+
+def run_benchmark(name, csv_path, cache_dir):
+    """Run one benchmark in a fresh process and return its summary."""
+    with tempfile.NamedTemporaryFile(suffix='.json') as result:
+        run_worker_process(name, csv_path, cache_dir, result.name)
+        with open(result.name) as f:
+            data = json.load(f)
+    return summarize(data['times'], data['peak_rss_mb'])
+
+
+def check_budgets(results):
+    """Print the benchmarks over their absolute budget and return them."""
+    over = []
+    for name, budget in BUDGETS_MS.items():
+        if name in results and results[name]['p50'] > budget:
+            print(f"{name}: p50 {results[name]['p50']:.0f} ms is over its {budget} ms budget")
+            over.append(name)
+    return over
+
+
+def compare(results, baseline, threshold):
+    """Print the change against the baseline and return the regressed benchmarks."""
+    regressions = []
+    print(f"\n{'benchmark':<16} {'p50 change':>11} {'peak change':>12}")
+    for name, summary in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<16} {'(new)':>11}")
+            continue
+        latency = summary['p50'] / base['p50'] - 1
+        memory = summary['peak_rss_mb'] / base['peak_rss_mb'] - 1
+        flag = ''
+        if latency > threshold or memory > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<16} {latency:>+10.1%} {memory:>+11.1%}{flag}")
+    return regressions
+
+
+def main():
+    """Generate data, run the benchmarks and compare them with the baseline."""
+    parser = argparse.ArgumentParser(description="Benchmark the MDRM explorer and analysis hot paths")
+    parser.add_argument('--rows', type=int, default=87000, help="rows of synthetic data to generate")
+    parser.add_argument('--csv', help="benchmark an existing MDRM CSV instead of generating one")
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline results JSON")
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the baseline")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed p50 latency or peak memory increase, as a fraction")
+    parser.add_argument('--output', help="also write the results to a JSON file")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--cache-dir', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.csv, args.cache_dir, args.result)
+        return
+
+    with tempfile.TemporaryDirectory(prefix='mdrm-bench-') as workdir:
+        csv_path = args.csv
+        if not csv_path:
+            csv_path = os.path.join(workdir, 'MDRM_CSV.csv')
+            print(f"Generating {args.rows} synthetic rows...")
+            write_mdrm_csv(generate_mdrm(args.rows), csv_path)
+        cache_dir = os.path.join(workdir, 'cache')
+        csv_path = os.path.abspath(csv_path)
+        run_worker_process('prepare', csv_path, cache_dir, os.devnull)
+
+        results = {}
+        print(f"{'benchmark':<16} {'n':>5} " + ' '.join(f"{f'p{p} ms':>10}" for p in PERCENTILES) + f" {'peak MB':>9}")
+        for name in args.only or list(BENCHMARKS):
+            summary = results[name] = run_benchmark(name, csv_path, cache_dir)
+            print(f"{name:<16} {summary['n']:>5} " + ' '.join(f"{summary[f'p{p}']:>10.2f}" for p in PERCENTILES) +
+                  f" {summary['peak_rss_mb']:>9.0f}")
+
+    report = {'rows': args.rows if not args.csv else None, 'csv': args.csv, 'benchmarks': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    over_budget = check_budgets(results)
+    regressions = []
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to '{args.baseline}'")
+    elif not os.path.exists(args.baseline):
+        print(f"\nNo baseline at '{args.baseline}'; run with --save-baseline to record one")
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if (baseline.get('rows'), baseline.get('csv')) != (report['rows'], report['csv']):
+            print(f"\nBaseline was recorded on different data ({baseline.get('csv') or baseline.get('rows')} rows); "
+                  f"not comparing")
+        else:
+            regressions = compare(results, baseline['benchmarks'], args.threshold)
+            if regressions:
+                print(f"\nRegressed beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            else:
+                print("\nNo regressions")
+    if over_budget:
+        print(f"\nOver budget: {', '.join(over_budget)}")
+    if regressions or over_budget:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
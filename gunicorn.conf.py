@@ -0,0 +1,40 @@
+"""
+Gunicorn configuration for serving the MDRM Explorer in production.
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+The app, and with it the MDRM dataset and its indexes, is loaded once in the
+master process before the workers are forked. Every worker then shares the
+same read-only pages (the large text columns are memory-mapped from the
+columnar cache) instead of parsing and holding its own copy, so adding
+workers adds little memory.
+
+Environment variables:
+    MDRM_BIND     address to listen on (default 0.0.0.0:56085)
+    MDRM_WORKERS  worker processes (default: one per CPU)
+    MDRM_THREADS  threads per worker (default 4)
+"""
+
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get('MDRM_BIND', '0.0.0.0:56085')
+workers = int(os.environ.get('MDRM_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('MDRM_THREADS', '4'))
+
+# Load the app (and the dataset) once, before forking the workers
+preload_app = True
+
+timeout = 120
+
+
+def pre_fork(server, worker):
+    # Keep the garbage collector from touching the preloaded objects, which
+    # would write to their pages and give each worker a private copy
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from wsgi import app
+    app.state.start_background_threads()
@@ -1,141 +1,324 @@
-
 #!/usr/bin/env python3
 """
 MDRM Data Analysis Script
 
 This script analyzes the MDRM_CSV.csv file and generates statistics and insights
 about the Micro Data Reference Manual (MDRM) data.
+
+All statistics come from one AnalysisResults object, which computes each value
+once and memoizes it, so the printed analysis, the summary report and the
+charts share the same results instead of rescanning the data.
 """
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
+import argparse
+from functools import cached_property
+from html import escape
 from datetime import datetime
 import os
+import re
+
+# pandas, numpy and the data loader are imported where they are used, so
+# importing this module (or asking the CLI for --help) stays near-instant
+from mdrm_charts import (CHARTS, CONFIDENTIALITY_CHART, ITEM_TYPE_CHART, MNEMONIC_CHART,
+                         chart_path, finish_charts, render_charts, submit_charts)
 
 def load_data():
-    """Load the MDRM data from CSV file."""
-    print("Loading MDRM data...")
-    df = pd.read_csv('/workspace/MDRM_CSV.csv', skiprows=1, encoding='utf-8')
-    print(f"Loaded {len(df)} rows of data")
-    return df
+    """Load the MDRM data from CSV file (via the columnar cache)."""
+    from mdrm_data import load_mdrm
+    return load_mdrm()
+
+def value_counts(column):
+    """Count a column's values, most frequent first, ties in order of first appearance.
+
+    Categorical columns would break ties by category (alphabetical) order;
+    counting the plain values keeps the order of the CSV, as the stream mode does.
+    Missing values are dropped first, since pandas 2 casts them to 'nan'.
+    """
+    counts = column.dropna().astype(str).value_counts(sort=False)
+    return counts.sort_values(ascending=False, kind='stable')
+
+class AnalysisResults:
+    """Memoized statistics about the MDRM data, computed on first use."""
+
+    def __init__(self, df):
+        self.df = df
+
+    @cached_property
+    def n_records(self):
+        return len(self.df)
+
+    @cached_property
+    def n_mnemonics(self):
+        return self.df['Mnemonic'].nunique()
+
+    @cached_property
+    def n_item_codes(self):
+        return self.df['Item Code'].nunique()
+
+    @cached_property
+    def n_reporting_forms(self):
+        return self.df['Reporting Form'].nunique()
+
+    @cached_property
+    def start_dates(self):
+        import pandas as pd
+        # Convert date columns to datetime if not already
+        if pd.api.types.is_datetime64_dtype(self.df['Start Date']):
+            return self.df['Start Date']
+        return pd.to_datetime(self.df['Start Date'], errors='coerce')
+
+    @cached_property
+    def end_dates(self):
+        import pandas as pd
+        if pd.api.types.is_datetime64_dtype(self.df['End Date']):
+            return self.df['End Date']
+        return pd.to_datetime(self.df['End Date'], errors='coerce')
+
+    @cached_property
+    def min_date(self):
+        return self.start_dates.min()
+
+    @cached_property
+    def max_date(self):
+        return self.end_dates.max()
+
+    @cached_property
+    def last_end_date(self):
+        from mdrm_asof import OPEN_END_DATE
+        # The latest real end date, skipping the open-end marker
+        return self.end_dates[self.end_dates != OPEN_END_DATE].max()
+
+    @cached_property
+    def n_active(self):
+        # Active items have an end date of 9999-12-31
+        return int((self.end_dates.dt.year == 9999).sum())
+
+    @cached_property
+    def mnemonic_counts(self):
+        return value_counts(self.df['Mnemonic'])
+
+    @cached_property
+    def item_type_counts(self):
+        return value_counts(self.df['ItemType'])
 
-def basic_stats(df):
+    @cached_property
+    def conf_counts(self):
+        return value_counts(self.df['Confidentiality'])
+
+    @cached_property
+    def item_code_counts(self):
+        return value_counts(self.df['Item Code'])
+
+    @cached_property
+    def form_counts(self):
+        return value_counts(self.df['Reporting Form'])
+
+    @cached_property
+    def item_cross_mnemonic(self):
+        return self.df.groupby('Item Code')['Mnemonic'].nunique().sort_values(ascending=False)
+
+    @cached_property
+    def item_code_table(self):
+        return item_code_consistency(self.df)
+
+    @cached_property
+    def as_of_index(self):
+        from mdrm_asof import AsOfIndex
+        return AsOfIndex(self.df)
+
+    @cached_property
+    def graph(self):
+        from mdrm_graph import RelationshipGraph
+        return RelationshipGraph(self.df)
+
+    def item_names(self, item_code):
+        """Return the distinct Item Names used with an Item Code."""
+        return self.item_code_table.at[item_code, 'item_names']
+
+def normalize_item_name(names):
+    """Normalize Item Names for comparison (case and whitespace insensitive)."""
+    return names.astype(str).str.upper().str.split().str.join(' ')
+
+def group_lists(keys, values):
+    """Split values into lists by runs of equal keys (keys must already be grouped)."""
+    import numpy as np
+    import pandas as pd
+    keys = np.asarray(keys, dtype=object)
+    values = np.asarray(values, dtype=object)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.array([], dtype=int)
+    return pd.Series([list(v) for v in np.split(values, starts[1:])] if len(keys) else [],
+                     index=pd.Index(keys[starts], dtype=object), dtype=object)
+
+def item_code_consistency(df):
+    """Build the item code -> mnemonics, names and name variants table in one pass.
+
+    Returns a DataFrame indexed by Item Code with the mnemonics using the code,
+    its distinct Item Names (in order of first appearance), the number of name
+    variants after normalizing case and whitespace, and whether the series
+    using the code give it different names.
+    """
+    mnemonics = df[['Item Code', 'Mnemonic']].dropna().astype(str).drop_duplicates()
+    series_names = df[['Item Code', 'Mnemonic', 'Item Name']].dropna().astype(str).drop_duplicates()
+    return consistency_table(mnemonics, series_names, df['Item Code'].value_counts())
+
+def count_name_sets(series_names):
+    """Count, per Item Code, the distinct sets of normalized Item Names its series use."""
+    named = series_names.assign(normalized=normalize_item_name(series_names['Item Name']))
+    named = (named.drop_duplicates(['Item Code', 'Mnemonic', 'normalized'])
+             .sort_values(['Item Code', 'Mnemonic', 'normalized']))
+    # One string per (code, series) holding its sorted names
+    name_sets = named.groupby(['Item Code', 'Mnemonic'], sort=False)['normalized'].agg('\n'.join)
+    return name_sets.reset_index().drop_duplicates(['Item Code', 'normalized'])['Item Code'].value_counts()
+
+def consistency_table(mnemonics, series_names, n_rows):
+    """Build the item code consistency table from distinct (Item Code, Mnemonic)
+    pairs, distinct (Item Code, Mnemonic, Item Name) triples (in order of first
+    appearance) and the row count of each Item Code."""
+    import pandas as pd
+    # Group the pairs by code; the stable sort keeps names in order of first
+    # appearance within each code
+    mnemonics = mnemonics.sort_values(['Item Code', 'Mnemonic'])
+    names = series_names[['Item Code', 'Item Name']].drop_duplicates()
+    names = names.sort_values('Item Code', kind='stable')
+    names = names.assign(normalized=normalize_item_name(names['Item Name']))
+
+    table = pd.DataFrame({
+        'n_mnemonics': mnemonics['Item Code'].value_counts(),
+        'mnemonics': group_lists(mnemonics['Item Code'], mnemonics['Mnemonic']).str.join(' '),
+        'n_rows': n_rows,
+        'item_names': group_lists(names['Item Code'], names['Item Name']),
+        'n_name_variants': names[['Item Code', 'normalized']].drop_duplicates()['Item Code'].value_counts(),
+        'n_name_sets': count_name_sets(series_names),
+    })
+    table.index.name = 'Item Code'
+    table['item_names'] = table['item_names'].map(lambda v: v if isinstance(v, list) else [])
+    table['n_mnemonics'] = table['n_mnemonics'].fillna(0).astype(int)
+    table['n_name_variants'] = table['n_name_variants'].fillna(0).astype(int)
+    # A code renamed the same way in every series is consistent; only series
+    # using different sets of names disagree
+    table['inconsistent_names'] = (table['n_mnemonics'] > 1) & (table['n_name_sets'].fillna(0) > 1)
+    table = table.drop(columns='n_name_sets')
+    return table.sort_values(['n_mnemonics', 'n_rows'], ascending=False, kind='stable')
+
+def export_item_code_consistency(table, path):
+    """Write the item code consistency table to CSV (or Parquet for .parquet paths)."""
+    table = table.assign(item_names=table['item_names'].str.join(' | ')).reset_index()
+    if path.endswith('.parquet'):
+        table.to_parquet(path, index=False)
+    else:
+        table.to_csv(path, index=False)
+
+def basic_stats(df, results=None):
     """Generate basic statistics about the dataset."""
+    results = results or AnalysisResults(df)
     print("\n=== BASIC STATISTICS ===")
-    print(f"Total number of records: {len(df)}")
-    print(f"Number of unique Mnemonics: {df['Mnemonic'].nunique()}")
-    print(f"Number of unique Item Codes: {df['Item Code'].nunique()}")
-    print(f"Number of unique Reporting Forms: {df['Reporting Form'].nunique()}")
-    
-    # Convert date columns to datetime
-    df['Start Date'] = pd.to_datetime(df['Start Date'], errors='coerce')
-    df['End Date'] = pd.to_datetime(df['End Date'], errors='coerce')
-    
+    print(f"Total number of records: {results.n_records}")
+    print(f"Number of unique Mnemonics: {results.n_mnemonics}")
+    print(f"Number of unique Item Codes: {results.n_item_codes}")
+    print(f"Number of unique Reporting Forms: {results.n_reporting_forms}")
+
     # Calculate the date range
-    min_date = df['Start Date'].min()
-    max_date = df['End Date'].max()
-    print(f"Date range: {min_date.strftime('%Y-%m-%d')} to {max_date.strftime('%Y-%m-%d')}")
-    
+    print(f"Date range: {results.min_date.strftime('%Y-%m-%d')} to {results.max_date.strftime('%Y-%m-%d')}")
+
     # Calculate active items (end date is 9999-12-31)
-    active_items = df[df['End Date'].dt.year == 9999]
-    print(f"Number of currently active items: {len(active_items)} ({len(active_items)/len(df)*100:.2f}%)")
+    print(f"Number of currently active items: {results.n_active} ({results.n_active/results.n_records*100:.2f}%)")
 
-def analyze_mnemonics(df):
+def print_charts(saved):
+    """Report the charts saved (or found up to date) by render_charts or finish_charts."""
+    for chart, path, rendered in saved:
+        if rendered:
+            print(f"Saved {chart.description} chart to '{path}'")
+        else:
+            print(f"The {chart.description} chart in '{path}' is up to date")
+
+def analyze_mnemonics(df, results=None, chart=True):
     """Analyze the distribution of Mnemonics."""
+    results = results or AnalysisResults(df)
     print("\n=== MNEMONIC ANALYSIS ===")
-    mnemonic_counts = df['Mnemonic'].value_counts()
+    mnemonic_counts = results.mnemonic_counts
     print(f"Top 20 most common Mnemonics:")
     print(mnemonic_counts.head(20))
-    
+
     # Calculate statistics
     print(f"\nMnemonic distribution statistics:")
     print(f"Mean items per Mnemonic: {mnemonic_counts.mean():.2f}")
     print(f"Median items per Mnemonic: {mnemonic_counts.median():.2f}")
     print(f"Min items per Mnemonic: {mnemonic_counts.min()}")
     print(f"Max items per Mnemonic: {mnemonic_counts.max()}")
-    
+
     # Plot the distribution of top 10 Mnemonics
-    plt.figure(figsize=(12, 6))
-    mnemonic_counts.head(10).plot(kind='bar')
-    plt.title('Top 10 Most Common Mnemonics')
-    plt.xlabel('Mnemonic')
-    plt.ylabel('Count')
-    plt.tight_layout()
-    plt.savefig('mnemonic_distribution.png')
-    print("Saved mnemonic distribution chart to 'mnemonic_distribution.png'")
-
-def analyze_item_types(df):
+    if chart:
+        print_charts(render_charts(results, charts=[MNEMONIC_CHART]))
+
+def analyze_item_types(df, results=None, chart=True):
     """Analyze the distribution of Item Types."""
+    results = results or AnalysisResults(df)
     print("\n=== ITEM TYPE ANALYSIS ===")
-    item_type_counts = df['ItemType'].value_counts()
+    item_type_counts = results.item_type_counts
     print("Item Type distribution:")
     print(item_type_counts)
-    
+
     # Calculate percentages
-    item_type_pct = item_type_counts / len(df) * 100
+    item_type_pct = item_type_counts / results.n_records * 100
     print("\nItem Type percentages:")
     for item_type, pct in item_type_pct.items():
         print(f"{item_type}: {pct:.2f}%")
-    
+
     # Plot the distribution
-    plt.figure(figsize=(10, 6))
-    item_type_counts.plot(kind='pie', autopct='%1.1f%%')
-    plt.title('Distribution of Item Types')
-    plt.ylabel('')
-    plt.tight_layout()
-    plt.savefig('item_type_distribution.png')
-    print("Saved item type distribution chart to 'item_type_distribution.png'")
-
-def analyze_confidentiality(df):
+    if chart:
+        print_charts(render_charts(results, charts=[ITEM_TYPE_CHART]))
+
+def analyze_confidentiality(df, results=None, chart=True):
     """Analyze the confidentiality distribution."""
+    results = results or AnalysisResults(df)
     print("\n=== CONFIDENTIALITY ANALYSIS ===")
-    conf_counts = df['Confidentiality'].value_counts()
+    conf_counts = results.conf_counts
     print("Confidentiality distribution:")
     print(conf_counts)
-    
+
     # Calculate percentages
-    conf_pct = conf_counts / len(df) * 100
+    conf_pct = conf_counts / results.n_records * 100
     print("\nConfidentiality percentages:")
     for conf, pct in conf_pct.items():
         print(f"{conf}: {pct:.2f}%")
-    
+
     # Plot the distribution
-    plt.figure(figsize=(8, 6))
-    conf_counts.plot(kind='pie', autopct='%1.1f%%', colors=['green', 'red', 'yellow'])
-    plt.title('Distribution of Confidentiality')
-    plt.ylabel('')
-    plt.tight_layout()
-    plt.savefig('confidentiality_distribution.png')
-    print("Saved confidentiality distribution chart to 'confidentiality_distribution.png'")
-
-def analyze_item_codes(df):
+    if chart:
+        print_charts(render_charts(results, charts=[CONFIDENTIALITY_CHART]))
+
+def analyze_item_codes(df, results=None):
     """Analyze the distribution of Item Codes."""
+    results = results or AnalysisResults(df)
     print("\n=== ITEM CODE ANALYSIS ===")
-    item_code_counts = df['Item Code'].value_counts()
+    item_code_counts = results.item_code_counts
     print(f"Top 20 most common Item Codes:")
     print(item_code_counts.head(20))
-    
+
     # Find items that appear across many mnemonics
     print("\nItem Codes that appear across the most Mnemonics:")
-    item_cross_mnemonic = df.groupby('Item Code')['Mnemonic'].nunique().sort_values(ascending=False)
+    item_cross_mnemonic = results.item_cross_mnemonic
     print(item_cross_mnemonic.head(10))
-    
+
+    # Item Codes whose name differs between the series that use them
+    n_inconsistent = int(results.item_code_table['inconsistent_names'].sum())
+    print(f"\nItem Codes whose Item Name differs across Mnemonics: {n_inconsistent}")
+
     # For the top 5 cross-mnemonic items, show their names
     print("\nDetails of top 5 cross-mnemonic items:")
     for item_code in item_cross_mnemonic.head(5).index:
-        item_names = df[df['Item Code'] == item_code]['Item Name'].unique()
+        item_names = results.item_names(item_code)
         print(f"Item Code {item_code} appears in {item_cross_mnemonic[item_code]} mnemonics")
         print(f"Item Name(s): {', '.join(item_names)}")
         print()
 
-def analyze_reporting_forms(df):
+def analyze_reporting_forms(df, results=None):
     """Analyze the distribution of Reporting Forms."""
+    results = results or AnalysisResults(df)
     print("\n=== REPORTING FORM ANALYSIS ===")
-    form_counts = df['Reporting Form'].value_counts()
+    form_counts = results.form_counts
     print(f"Top 20 most common Reporting Forms:")
     print(form_counts.head(20))
-    
+
     # Calculate statistics
     print(f"\nReporting Form distribution statistics:")
     print(f"Mean items per Reporting Form: {form_counts.mean():.2f}")
@@ -143,88 +326,286 @@ def analyze_reporting_forms(df):
     print(f"Min items per Reporting Form: {form_counts.min()}")
     print(f"Max items per Reporting Form: {form_counts.max()}")
 
-def generate_summary_report(df):
+def as_of_label(date, reporting_form=None):
+    """Return a heading label for a point-in-time question."""
+    return f"{date}" + (f" ({reporting_form})" if reporting_form else "")
+
+def analyze_as_of(df, date, results=None, reporting_form=None, items_csv=None):
+    """Report the items valid on a date, optionally for one Reporting Form."""
+    results = results or AnalysisResults(df)
+    print(f"\n=== ITEMS VALID ON {as_of_label(date, reporting_form)} ===")
+    rows = results.as_of_index.valid_rows(date, reporting_form=reporting_form)
+    valid = df.iloc[rows]
+    print(f"Number of valid items: {len(valid)}")
+    print(f"Number of Mnemonics with valid items: {valid['Mnemonic'].nunique()}")
+    if not reporting_form:
+        print("\nTop 10 Reporting Forms by valid items:")
+        print(value_counts(valid['Reporting Form']).head(10))
+    if items_csv:
+        valid.to_csv(items_csv, index=False)
+        print(f"Valid items saved to '{items_csv}'")
+
+def analyze_changes(df, start_date, end_date, results=None, reporting_form=None, items_csv=None):
+    """Report the items added and ended between two dates, optionally for one Reporting Form."""
+    import pandas as pd
+    results = results or AnalysisResults(df)
+    print(f"\n=== CHANGES FROM {as_of_label(start_date, reporting_form)} TO {end_date} ===")
+    added, removed = results.as_of_index.changes(start_date, end_date, reporting_form=reporting_form)
+    print(f"Items added: {len(added)}")
+    print(f"Items no longer valid: {len(removed)}")
+    changes = pd.concat([df.iloc[added].assign(Change='added'), df.iloc[removed].assign(Change='ended')])
+    for change, frame in changes.groupby('Change', sort=False):
+        print(f"\nMnemonics with the most {change} items:")
+        print(value_counts(frame['Mnemonic']).head(10))
+    if items_csv:
+        changes.to_csv(items_csv, index=False)
+        print(f"Changed items saved to '{items_csv}'")
+
+def analyze_related(df, name, results=None, top=10, by='shared'):
+    """Report the series sharing the most Item Codes with a Mnemonic or Reporting Form."""
+    results = results or AnalysisResults(df)
+    try:
+        graph = results.graph.graph_for(name)
+    except KeyError:
+        print(f"\nUnknown Mnemonic or Reporting Form: {name}")
+        return
+    print(f"\n=== SERIES RELATED TO {name} ===")
+    print(f"Item Codes used by {name}: {graph.sizes[graph.position(name)]}")
+    neighbors = graph.neighbors(name, k=top, by=by)
+    if neighbors.empty:
+        print(f"No other {graph.column} shares an Item Code with {name}")
+        return
+    print(f"\nTop {top} {graph.column}s by {'shared items' if by == 'shared' else 'Jaccard similarity'}:")
+    print(neighbors.round({'jaccard': 4}).to_string(index=False))
+
+def analyze_item_series(df, item_code, results=None):
+    """Report the Mnemonics and Reporting Forms that use an Item Code."""
+    results = results or AnalysisResults(df)
+    print(f"\n=== SERIES USING ITEM CODE {item_code} ===")
+    for kind, series in results.graph.series_with_item(item_code).items():
+        column = results.graph.graphs[kind].column
+        print(f"{column}s: {len(series)}")
+        if len(series):
+            print("  " + ", ".join(series))
+
+def generate_summary_report(df, results=None):
     """Generate a summary report of the MDRM data."""
+    import pandas as pd
+    results = results or AnalysisResults(df)
     print("\n=== GENERATING SUMMARY REPORT ===")
-    
+    n_records = results.n_records
+
     # Create a summary report file
     with open('mdrm_summary_report.txt', 'w') as f:
         f.write("MDRM DATA SUMMARY REPORT\n")
         f.write("=======================\n\n")
         f.write(f"Report generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-        
+
         f.write("DATASET OVERVIEW\n")
         f.write("-----------------\n")
-        f.write(f"Total number of records: {len(df)}\n")
-        f.write(f"Number of unique Mnemonics: {df['Mnemonic'].nunique()}\n")
-        f.write(f"Number of unique Item Codes: {df['Item Code'].nunique()}\n")
-        f.write(f"Number of unique Reporting Forms: {df['Reporting Form'].nunique()}\n\n")
-        
-        # Convert date columns to datetime if not already
-        if not pd.api.types.is_datetime64_dtype(df['Start Date']):
-            df['Start Date'] = pd.to_datetime(df['Start Date'], errors='coerce')
-        if not pd.api.types.is_datetime64_dtype(df['End Date']):
-            df['End Date'] = pd.to_datetime(df['End Date'], errors='coerce')
-        
-        min_date = df['Start Date'].min()
-        max_date = df['End Date'].max()
-        f.write(f"Date range: {min_date.strftime('%Y-%m-%d')} to {max_date.strftime('%Y-%m-%d')}\n\n")
-        
-        active_items = df[df['End Date'].dt.year == 9999]
-        f.write(f"Number of currently active items: {len(active_items)} ({len(active_items)/len(df)*100:.2f}%)\n\n")
-        
+        f.write(f"Total number of records: {n_records}\n")
+        f.write(f"Number of unique Mnemonics: {results.n_mnemonics}\n")
+        f.write(f"Number of unique Item Codes: {results.n_item_codes}\n")
+        f.write(f"Number of unique Reporting Forms: {results.n_reporting_forms}\n\n")
+
+        f.write(f"Date range: {results.min_date.strftime('%Y-%m-%d')} to {results.max_date.strftime('%Y-%m-%d')}\n\n")
+
+        f.write(f"Number of currently active items: {results.n_active} ({results.n_active/n_records*100:.2f}%)\n\n")
+
         f.write("MNEMONIC DISTRIBUTION\n")
         f.write("---------------------\n")
-        mnemonic_counts = df['Mnemonic'].value_counts()
         f.write("Top 10 most common Mnemonics:\n")
-        for mnemonic, count in mnemonic_counts.head(10).items():
+        for mnemonic, count in results.mnemonic_counts.head(10).items():
             f.write(f"{mnemonic}: {count} items\n")
         f.write("\n")
-        
+
         f.write("ITEM TYPE DISTRIBUTION\n")
         f.write("---------------------\n")
-        item_type_counts = df['ItemType'].value_counts()
-        for item_type, count in item_type_counts.items():
-            f.write(f"{item_type}: {count} items ({count/len(df)*100:.2f}%)\n")
+        for item_type, count in results.item_type_counts.items():
+            f.write(f"{item_type}: {count} items ({count/n_records*100:.2f}%)\n")
         f.write("\n")
-        
+
         f.write("CONFIDENTIALITY DISTRIBUTION\n")
         f.write("---------------------------\n")
-        conf_counts = df['Confidentiality'].value_counts()
-        for conf, count in conf_counts.items():
-            f.write(f"{conf}: {count} items ({count/len(df)*100:.2f}%)\n")
+        for conf, count in results.conf_counts.items():
+            f.write(f"{conf}: {count} items ({count/n_records*100:.2f}%)\n")
         f.write("\n")
-        
+
         f.write("CROSS-MNEMONIC ITEMS\n")
         f.write("-------------------\n")
-        item_cross_mnemonic = df.groupby('Item Code')['Mnemonic'].nunique().sort_values(ascending=False)
         f.write("Top 10 Item Codes that appear across the most Mnemonics:\n")
-        for item_code, count in item_cross_mnemonic.head(10).items():
-            item_names = df[df['Item Code'] == item_code]['Item Name'].unique()
+        for item_code, count in results.item_cross_mnemonic.head(10).items():
+            item_names = results.item_names(item_code)
             f.write(f"{item_code} ({', '.join(item_names[:1])}): appears in {count} mnemonics\n")
         f.write("\n")
-        
+
         f.write("REPORTING FORM DISTRIBUTION\n")
         f.write("--------------------------\n")
-        form_counts = df['Reporting Form'].value_counts()
         f.write("Top 10 most common Reporting Forms:\n")
-        for form, count in form_counts.head(10).items():
+        for form, count in results.form_counts.head(10).items():
             if pd.notna(form):
                 f.write(f"{form}: {count} items\n")
         f.write("\n")
-    
+
     print(f"Summary report saved to 'mdrm_summary_report.txt'")
 
+ITEM_TYPE_DESCRIPTIONS = {
+    'F': "Financial/reported: Item is submitted by the reporter",
+    'D': "Derived: Item is derived from other stored variables",
+    'P': "Percentage: Item is stored as a percentage value (e.g., 28% is stored as 28)",
+    'R': "Rate: Item is stored as a decimal value (e.g., 28% is stored as .28)",
+    'S': "Structure: Item describes an institution",
+    'J': "Projected: Item is a projected value with an associated projection period",
+}
+
+CONFIDENTIALITY_LABELS = {'Y': 'Confidential', 'N': 'Public'}
+
+def html_rows(rows):
+    """Format table rows as indented <tr> blocks."""
+    lines = []
+    for row in rows:
+        lines.append('<tr>')
+        lines.extend(f'    <td>{escape(str(value))}</td>' for value in row)
+        lines.append('</tr>')
+    return lines
+
+def fill_html_section(page, name, lines):
+    """Replace the lines between a section's begin/end markers in the summary page."""
+    pattern = re.compile(rf'^([ \t]*)<!-- begin {name} -->\n.*?^[ \t]*<!-- end {name} -->', re.M | re.S)
+    def replace(match):
+        indent = match.group(1)
+        body = ''.join(f'{indent}{line}\n' for line in lines)
+        return f'{indent}<!-- begin {name} -->\n{body}{indent}<!-- end {name} -->'
+    page, n = pattern.subn(replace, page)
+    if not n:
+        raise ValueError(f"The summary page has no '{name}' section markers")
+    return page
+
+def update_summary_html(results, path='mdrm_summary.html', chart_dir='.'):
+    """Refresh the statistics, tables and charts of the summary page in place."""
+    n_records = results.n_records
+    with open(path, encoding='utf-8') as f:
+        page = f.read()
+
+    page = fill_html_section(page, 'item-types', html_rows(
+        (item_type, ITEM_TYPE_DESCRIPTIONS.get(item_type, ''), f"{count/n_records*100:.2f}%")
+        for item_type, count in results.item_type_counts.items()))
+    page = fill_html_section(page, 'dataset-statistics', [
+        f"<li><strong>Total records:</strong> {n_records:,}</li>",
+        f"<li><strong>Unique Mnemonics:</strong> {results.n_mnemonics:,}</li>",
+        f"<li><strong>Unique Item Codes:</strong> {results.n_item_codes:,}</li>",
+        f"<li><strong>Unique Reporting Forms:</strong> {results.n_reporting_forms:,}</li>",
+        f"<li><strong>Date range:</strong> {results.min_date.strftime('%Y-%m-%d')} "
+        f"to {results.last_end_date.strftime('%Y-%m-%d')}</li>",
+    ])
+    page = fill_html_section(page, 'confidentiality', [
+        f"<li><strong>{escape(CONFIDENTIALITY_LABELS.get(conf, str(conf)))} ({escape(str(conf))}):</strong> "
+        f"{count/n_records*100:.2f}%</li>"
+        for conf, count in results.conf_counts.items()])
+    page = fill_html_section(page, 'top-mnemonics', html_rows(
+        (mnemonic, f"{count:,}") for mnemonic, count in results.mnemonic_counts.head(8).items()))
+    page = fill_html_section(page, 'top-forms', html_rows(
+        (form, f"{count:,}") for form, count in results.form_counts.dropna().head(8).items()))
+    page = fill_html_section(page, 'cross-mnemonic', html_rows(
+        (item_code, ', '.join(results.item_names(item_code)[:1]), count)
+        for item_code, count in results.item_cross_mnemonic.head(5).items()))
+
+    # Chart images are linked relative to the page
+    page_dir = os.path.dirname(os.path.abspath(path))
+    page = fill_html_section(page, 'charts', [
+        f'<div class="chart"><img src="{escape(os.path.relpath(chart_path(chart, chart_dir), page_dir))}" '
+        f'alt="{escape(chart.title)}"></div>'
+        for chart in CHARTS])
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(page)
+
+def run_analysis(df, results, pool=None, html_path=None):
+    """Print the analysis and write the report and charts from one results object."""
+    # Start the charts first so they render in the pool while the text is printed
+    pending = submit_charts(results, pool) if pool is not None else []
+
+    basic_stats(df, results)
+    analyze_mnemonics(df, results, chart=pool is None)
+    analyze_item_types(df, results, chart=pool is None)
+    analyze_confidentiality(df, results, chart=pool is None)
+    analyze_item_codes(df, results)
+    analyze_reporting_forms(df, results)
+    generate_summary_report(df, results)
+
+    print_charts(finish_charts(pending))
+    if html_path:
+        update_summary_html(results, html_path)
+        print(f"Summary page updated in '{html_path}'")
+
 def main():
     """Main function to run the analysis."""
-    df = load_data()
-    basic_stats(df)
-    analyze_mnemonics(df)
-    analyze_item_types(df)
-    analyze_confidentiality(df)
-    analyze_item_codes(df)
-    analyze_reporting_forms(df)
-    generate_summary_report(df)
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=min(len(CHARTS), os.cpu_count() or 1),
+                        help="processes used to render the charts (1 or less renders them inline)")
+    parser.add_argument('--consistency-report', metavar='PATH',
+                        help="also export the full item code consistency table (CSV, or Parquet for .parquet)")
+    parser.add_argument('--as-of', metavar='DATE',
+                        help="only report the items valid on DATE (YYYY-MM-DD)")
+    parser.add_argument('--changes', nargs=2, metavar=('START', 'END'),
+                        help="only report the items added and ended between two dates")
+    parser.add_argument('--form', metavar='FORM',
+                        help="limit --as-of and --changes to one Reporting Form")
+    parser.add_argument('--items-csv', metavar='PATH',
+                        help="save the items found by --as-of or --changes to a CSV file")
+    parser.add_argument('--related', metavar='NAME',
+                        help="only report the Mnemonics or Reporting Forms sharing the most items with NAME")
+    parser.add_argument('--item-series', metavar='ITEM_CODE',
+                        help="only report the Mnemonics and Reporting Forms using ITEM_CODE")
+    parser.add_argument('--top', type=int, default=10,
+                        help="number of related series reported by --related")
+    parser.add_argument('--by', choices=('shared', 'jaccard'), default='shared',
+                        help="rank --related by shared item count or Jaccard similarity")
+    parser.add_argument('--html', nargs='?', const='mdrm_summary.html', metavar='PATH',
+                        help="also refresh the statistics and charts of the summary page "
+                             "(mdrm_summary.html by default)")
+    parser.add_argument('--stream', nargs='*', metavar='CSV',
+                        help="analyze the CSV (or several, e.g. historical releases) in blocks "
+                             "instead of loading it into memory")
+    parser.add_argument('--parse-workers', type=int, default=1,
+                        help="processes parsing blocks in --stream mode")
+    args = parser.parse_args()
+
+    if args.stream is not None:
+        if args.as_of or args.changes or args.related or args.item_series:
+            parser.error("--as-of, --changes, --related and --item-series need the full data "
+                         "and can't be used with --stream")
+        from mdrm_stream import stream_results
+        print("Streaming MDRM data...")
+        df = None
+        results = stream_results(args.stream, workers=args.parse_workers)
+        print(f"Analyzed {results.n_records} rows of data")
+    else:
+        df = load_data()
+        results = AnalysisResults(df)
+    if args.consistency_report:
+        export_item_code_consistency(results.item_code_table, args.consistency_report)
+        print(f"Item code consistency table saved to '{args.consistency_report}'")
+    if args.as_of or args.changes:
+        # Point-in-time questions skip the full analysis
+        if args.as_of:
+            analyze_as_of(df, args.as_of, results, args.form, args.items_csv)
+        if args.changes:
+            analyze_changes(df, *args.changes, results, args.form, args.items_csv)
+        return
+    if args.related or args.item_series:
+        # Relationship questions skip the full analysis too
+        if args.related:
+            analyze_related(df, args.related, results, args.top, args.by)
+        if args.item_series:
+            analyze_item_series(df, args.item_series, results)
+        return
+    if args.workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            run_analysis(df, results, pool, args.html)
+    else:
+        run_analysis(df, results, html_path=args.html)
     print("\nAnalysis complete!")
 
 if __name__ == "__main__":
@@ -0,0 +1,130 @@
+"""
+MDRM Point-in-Time Queries
+
+This module answers "which items were valid on a date" and "what changed
+between two dates" from each row's Start Date/End Date validity window. Rows
+are kept in two sorted orders (by start and by end), so change lists are
+binary searches, and listing the items valid on a date only touches the
+smaller side of the split. Queries can be narrowed to one Reporting Form
+or Mnemonic, whose rows get their own sorted arrays on first use.
+"""
+
+import numpy as np
+import pandas as pd
+
+# End date used by the MDRM for items that are still being collected
+OPEN_END_DATE = np.datetime64('9999-12-31', 's')
+
+
+def to_date(value):
+    """Convert a date string, datetime or Timestamp to datetime64[s]."""
+    return np.datetime64(pd.Timestamp(value).to_pydatetime(), 's')
+
+
+def date_column(series):
+    """Return a date column as a datetime64[s] array."""
+    if not pd.api.types.is_datetime64_any_dtype(series):
+        series = pd.to_datetime(series, errors='coerce')
+    return series.to_numpy().astype('datetime64[s]')
+
+
+class ValidityIndex:
+    """Rows sorted by Start Date and by End Date for O(log n) point-in-time lookups."""
+
+    def __init__(self, starts, ends, rows):
+        by_start = np.argsort(starts, kind='stable')
+        self.starts = starts[by_start]
+        self.start_rows = rows[by_start]
+        self.start_ends = ends[by_start]
+        by_end = np.argsort(ends, kind='stable')
+        self.ends = ends[by_end]
+        self.end_rows = rows[by_end]
+        self.end_starts = starts[by_end]
+
+    def valid_rows(self, date):
+        """Return the sorted row ids with Start Date <= date <= End Date."""
+        started = np.searchsorted(self.starts, date, side='right')
+        ended = np.searchsorted(self.ends, date, side='left')
+        # Scan whichever side is smaller: rows started by the date, or rows
+        # still open on it
+        if started <= len(self.ends) - ended:
+            rows = self.start_rows[:started][self.start_ends[:started] >= date]
+        else:
+            rows = self.end_rows[ended:][self.end_starts[ended:] <= date]
+        return np.sort(rows)
+
+    def started_between(self, after, until):
+        """Return the row ids with after < Start Date <= until."""
+        lo = np.searchsorted(self.starts, after, side='right')
+        hi = np.searchsorted(self.starts, until, side='right')
+        return np.sort(self.start_rows[lo:hi])
+
+    def ended_between(self, since, before):
+        """Return the row ids with since <= End Date < before."""
+        lo = np.searchsorted(self.ends, since, side='left')
+        hi = np.searchsorted(self.ends, before, side='left')
+        return np.sort(self.end_rows[lo:hi])
+
+
+class AsOfIndex:
+    """Point-in-time queries over the MDRM data, optionally per Reporting Form or Mnemonic."""
+
+    def __init__(self, df):
+        self.starts = date_column(df['Start Date'])
+        # A missing end date means the item is still open
+        self.ends = date_column(df['End Date'])
+        self.ends[np.isnat(self.ends)] = OPEN_END_DATE
+        # Rows without a start date, or ending before they start, were never valid
+        self.dated_rows = np.flatnonzero(~np.isnat(self.starts) & (self.ends >= self.starts))
+        self.df = df
+        self.group_rows = {}
+        self.indexes = {}
+        # Shared by every query matching no rows
+        self.empty = ValidityIndex(self.starts[:0], self.ends[:0], self.dated_rows[:0])
+
+    def groups(self, column):
+        """Return each value of a column with its row ids (grouped once per column)."""
+        if column not in self.group_rows:
+            codes, uniques = pd.factorize(self.df[column])
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            self.group_rows[column] = {value: order[bounds[i]:bounds[i + 1]] for i, value in enumerate(uniques)}
+        return self.group_rows[column]
+
+    def index_for(self, reporting_form=None, mnemonic=None):
+        """Return the ValidityIndex covering the requested rows (built on first use).
+
+        Only forms, mnemonics and combinations of the two that have rows are
+        cached; every other query gets the shared empty index, so arbitrary
+        values can't grow the cache.
+        """
+        key = (reporting_form, mnemonic)
+        if key in self.indexes:
+            return self.indexes[key]
+        rows = self.dated_rows
+        for column, value in (('Reporting Form', reporting_form), ('Mnemonic', mnemonic)):
+            if value is not None:
+                if value not in self.groups(column):
+                    return self.empty
+                rows = np.intersect1d(rows, self.groups(column)[value], assume_unique=True)
+        if len(rows) == 0:
+            return self.empty
+        self.indexes[key] = ValidityIndex(self.starts[rows], self.ends[rows], rows)
+        return self.indexes[key]
+
+    def valid_rows(self, date, reporting_form=None, mnemonic=None):
+        """Return the sorted row ids of the items valid on a date."""
+        return self.index_for(reporting_form, mnemonic).valid_rows(to_date(date))
+
+    def changes(self, start_date, end_date, reporting_form=None, mnemonic=None):
+        """Return (added, removed) row ids between two dates.
+
+        Added rows became valid after start_date and by end_date; removed rows
+        were valid on start_date but ended before end_date.
+        """
+        index = self.index_for(reporting_form, mnemonic)
+        start_date, end_date = to_date(start_date), to_date(end_date)
+        added = index.started_between(start_date, end_date)
+        removed = index.ended_between(start_date, end_date)
+        # An item both added and removed in the window was never valid on either date
+        return np.setdiff1d(added, removed, assume_unique=True), np.setdiff1d(removed, added, assume_unique=True)
@@ -0,0 +1,159 @@
+"""
+MDRM Analysis Charts
+
+This module renders the analysis charts (top Mnemonics, Item Types and
+Confidentiality) headlessly: each chart is drawn on its own matplotlib Figure
+with an Agg canvas, without pyplot's global figure state, so repeated runs
+don't accumulate open figures and charts can be rendered in worker processes.
+A manifest next to the charts records a hash of the data behind each saved
+chart, and charts whose data hasn't changed are not rendered again.
+"""
+
+import hashlib
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import Future
+
+# Bump when the chart drawing changes, so charts saved by older code are rendered again
+CHART_VERSION = 1
+
+# Data hash of each saved chart, kept in the directory the charts are saved to
+MANIFEST_NAME = '.mdrm_charts.json'
+
+# name: file name without extension; attribute: AnalysisResults value counts shown;
+# top: number of leading values shown (None for all); title: chart title and image
+# alt text; description: name used in messages; draw(ax, counts): draws the data
+Chart = namedtuple('Chart', 'name attribute top title description figsize draw')
+
+
+def draw_mnemonic_distribution(ax, counts):
+    """Draw the top Mnemonics as a bar chart."""
+    ax.bar(counts.index.astype(str), counts.to_numpy(), width=0.5)
+    ax.tick_params(axis='x', labelrotation=90)
+    ax.set_xlabel('Mnemonic')
+    ax.set_ylabel('Count')
+
+
+def draw_item_type_distribution(ax, counts):
+    """Draw the Item Types as a pie chart."""
+    ax.pie(counts.to_numpy(), labels=counts.index.astype(str), autopct='%1.1f%%')
+
+
+def draw_confidentiality_distribution(ax, counts):
+    """Draw the confidentiality flags as a pie chart."""
+    ax.pie(counts.to_numpy(), labels=counts.index.astype(str), autopct='%1.1f%%',
+           colors=['green', 'red', 'yellow'])
+
+
+CHARTS = [
+    Chart('mnemonic_distribution', 'mnemonic_counts', 10, 'Top 10 Most Common Mnemonics',
+          'mnemonic distribution', (12, 6), draw_mnemonic_distribution),
+    Chart('item_type_distribution', 'item_type_counts', None, 'Distribution of Item Types',
+          'item type distribution', (10, 6), draw_item_type_distribution),
+    Chart('confidentiality_distribution', 'conf_counts', None, 'Distribution of Confidentiality',
+          'confidentiality distribution', (8, 6), draw_confidentiality_distribution),
+]
+MNEMONIC_CHART, ITEM_TYPE_CHART, CONFIDENTIALITY_CHART = CHARTS
+
+
+def load_backend():
+    """Import the Agg canvas (done before forking workers so they inherit it)."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    return Figure, FigureCanvasAgg
+
+
+def render_chart(chart, counts, path):
+    """Draw one chart on an Agg canvas and save it as a PNG."""
+    Figure, FigureCanvasAgg = load_backend()
+    figure = Figure(figsize=chart.figsize)
+    FigureCanvasAgg(figure)
+    chart.draw(figure.add_subplot(), counts)
+    figure.axes[0].set_title(chart.title)
+    figure.tight_layout()
+    figure.savefig(path)
+    return path
+
+
+def chart_data(chart, results):
+    """Return the value counts a chart shows."""
+    counts = getattr(results, chart.attribute)
+    return counts if chart.top is None else counts.head(chart.top)
+
+
+def chart_digest(chart, counts):
+    """Return a hash of everything a chart's image depends on."""
+    import pandas as pd
+    digest = hashlib.sha256(f'{chart.name}:{chart.title}:{CHART_VERSION}'.encode())
+    digest.update(pd.util.hash_pandas_object(counts).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def read_manifest(output_dir):
+    """Load the chart hash manifest (empty when missing or unreadable)."""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(output_dir, manifest):
+    """Save the chart hash manifest, replacing the file so readers never see it half written."""
+    from mdrm_data import write_atomic
+
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+    write_atomic(os.path.join(output_dir, MANIFEST_NAME), write)
+
+
+def chart_path(chart, output_dir='.'):
+    """Return the PNG path of a chart."""
+    return os.path.normpath(os.path.join(output_dir, f'{chart.name}.png'))
+
+
+def submit_charts(results, pool=None, output_dir='.', charts=CHARTS):
+    """Start rendering the charts whose data changed since they were last saved.
+
+    Stale charts are submitted to the pool, or rendered right away without one.
+    Returns (chart, path, digest, future) entries for finish_charts; the future
+    is None for charts that are already up to date.
+    """
+    manifest = read_manifest(output_dir)
+    pending = []
+    for chart in charts:
+        counts = chart_data(chart, results)
+        path = chart_path(chart, output_dir)
+        digest = chart_digest(chart, counts)
+        future = None
+        if manifest.get(chart.name) != digest or not os.path.exists(path):
+            if pool is None:
+                future = Future()
+                future.set_result(render_chart(chart, counts, path))
+            else:
+                # Workers forked from here inherit matplotlib instead of importing it again
+                load_backend()
+                future = pool.submit(render_chart, chart, counts, path)
+        pending.append((chart, path, digest, future))
+    return pending
+
+
+def finish_charts(pending, output_dir='.'):
+    """Wait for submitted charts and record their hashes; return (chart, path, rendered) for each."""
+    manifest = read_manifest(output_dir)
+    saved = []
+    for chart, path, digest, future in pending:
+        if future is not None:
+            future.result()
+            manifest[chart.name] = digest
+        saved.append((chart, path, future is not None))
+    write_manifest(output_dir, manifest)
+    return saved
+
+
+def render_charts(results, pool=None, output_dir='.', charts=CHARTS):
+    """Render the stale charts and return (chart, path, rendered) for each."""
+    return finish_charts(submit_charts(results, pool, output_dir, charts), output_dir)
+
@@ -0,0 +1,199 @@
+"""
+MDRM Data Loader
+
+This module loads the MDRM_CSV.csv file into a normalized DataFrame and keeps
+a columnar Feather copy next to it, so later loads skip CSV parsing entirely.
+The cache is keyed on the CSV's modification time, size and SHA-256 hash.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Location of the MDRM CSV, overridable for deployments that keep it elsewhere
+CSV_PATH = os.environ.get('MDRM_CSV', '/workspace/MDRM_CSV.csv')
+
+# Directory for the columnar cache (defaults to .mdrm_cache next to the CSV)
+CACHE_DIR = os.environ.get('MDRM_CACHE_DIR')
+
+COLUMNS = ['Mnemonic', 'Item Code', 'Start Date', 'End Date', 'Item Name',
+           'Confidentiality', 'ItemType', 'Reporting Form', 'Description', 'SeriesGlossary']
+CATEGORY_COLUMNS = ['Mnemonic', 'Confidentiality', 'ItemType', 'Reporting Form']
+DATE_COLUMNS = ['Start Date', 'End Date']
+
+# Large text columns kept as Arrow strings so they stay in the memory-mapped file
+TEXT_COLUMNS = ['Description', 'SeriesGlossary']
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def parse_dates(values):
+    """Parse MDRM date strings to datetime64[s], keeping the 9999-12-31 end date."""
+    from dateutil import parser
+
+    # Only a few thousand distinct dates exist, so parse each one once
+    codes, uniques = pd.factorize(values)
+    parsed = []
+    for text in uniques:
+        try:
+            parsed.append(np.datetime64(parser.parse(str(text)), 's'))
+        except (ValueError, OverflowError):
+            parsed.append(np.datetime64('NaT', 's'))
+    # Trailing NaT so missing values (code -1) map to it
+    parsed = np.array(parsed + [np.datetime64('NaT', 's')], dtype='datetime64[s]')
+    return pd.Series(parsed[codes], index=values.index, name=values.name)
+
+
+def format_date(value):
+    """Format a date as YYYY-MM-DD, or an empty string when missing."""
+    return '' if pd.isna(value) else value.strftime('%Y-%m-%d')
+
+
+def read_csv(csv_path):
+    """Parse the MDRM CSV into a normalized DataFrame."""
+    # Skip the first row which contains "PUBLIC"
+    df = pd.read_csv(csv_path, skiprows=1, encoding='utf-8',
+                     dtype={'Mnemonic': str, 'Item Code': str})
+    for column in DATE_COLUMNS:
+        df[column] = parse_dates(df[column])
+    for column in CATEGORY_COLUMNS:
+        df[column] = df[column].astype('category')
+    return df
+
+
+def file_sha256(path):
+    """Return the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_cache(cache_path):
+    """Load a cached Feather file, memory-mapping the large text columns."""
+    import pyarrow as pa
+    from pyarrow import feather
+
+    table = feather.read_table(cache_path, memory_map=True)
+    other = [c for c in table.column_names if c not in TEXT_COLUMNS]
+    df = table.select(other).to_pandas()
+    for column in TEXT_COLUMNS:
+        values = table.column(column)
+        if not pa.types.is_large_string(values.type):
+            # A column with no values at all is stored as nulls
+            values = values.cast(pa.large_string())
+        # Zero-copy: the strings are paged in from the mapped file on access
+        df[column] = pd.arrays.ArrowStringArray(values)
+    return df[COLUMNS]
+
+
+def write_atomic(path, write):
+    """Call write(tmp_path) on a unique file next to path, then rename it over path.
+
+    Concurrent writers each get their own temporary file, and readers only
+    ever see a complete file.
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp',
+                                    dir=os.path.dirname(path) or '.')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_cache(df, cache_path):
+    """Write the DataFrame to an uncompressed (mappable) Feather file."""
+    write_atomic(cache_path, lambda tmp_path: df.reset_index(drop=True).to_feather(
+        tmp_path, compression='uncompressed'))
+
+
+def write_manifest(manifest_path, manifest):
+    """Save the cache manifest."""
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+    write_atomic(manifest_path, write)
+
+
+def default_cache_dir(csv_path=None):
+    """Return the directory holding the MDRM caches for a CSV."""
+    csv_path = os.path.abspath(csv_path or CSV_PATH)
+    return CACHE_DIR or os.path.join(os.path.dirname(csv_path), '.mdrm_cache')
+
+
+def cache_file(cache_dir, sha256):
+    """Return the path of the columnar cache of one CSV version."""
+    return os.path.join(cache_dir, f'mdrm-{sha256[:16]}.feather')
+
+
+def load_mdrm(csv_path=None, cache_dir=None, use_cache=True):
+    """Load the MDRM data, using the columnar cache when it is up to date."""
+    csv_path = os.path.abspath(csv_path or CSV_PATH)
+    print("Loading MDRM data...")
+    if not use_cache:
+        df = read_csv(csv_path)
+        print(f"Loaded {len(df)} rows of data")
+        df.attrs['mdrm_version'] = file_sha256(csv_path)
+        return df
+
+    cache_dir = cache_dir or default_cache_dir(csv_path)
+    manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+
+    # Trust the stored hash while mtime and size are unchanged; rehash otherwise
+    stat = os.stat(csv_path)
+    fingerprint = {'csv_path': csv_path, 'mtime': stat.st_mtime, 'size': stat.st_size}
+    if all(manifest.get(k) == v for k, v in fingerprint.items()):
+        sha256 = manifest['sha256']
+    else:
+        sha256 = file_sha256(csv_path)
+    cache_path = cache_file(cache_dir, sha256)
+
+    df = None
+    if os.path.exists(cache_path):
+        try:
+            df = read_cache(cache_path)
+            print(f"Loaded {len(df)} rows of data (from cache)")
+        except Exception as e:
+            # A truncated or corrupt cache must not block loading; rebuild it
+            print(f"Could not read MDRM cache '{cache_path}' ({e}); parsing the CSV instead")
+            try:
+                os.remove(cache_path)
+            except OSError:
+                pass
+    if df is None:
+        df = read_csv(csv_path)
+        print(f"Loaded {len(df)} rows of data")
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            write_cache(df, cache_path)
+            # Drop caches of previous CSV versions
+            for name in os.listdir(cache_dir):
+                if name.startswith('mdrm-') and name.endswith('.feather') and name != os.path.basename(cache_path):
+                    os.remove(os.path.join(cache_dir, name))
+        except OSError as e:
+            print(f"Could not write MDRM cache to '{cache_dir}': {e}")
+
+    if os.path.exists(cache_path) and manifest != dict(fingerprint, sha256=sha256):
+        try:
+            write_manifest(manifest_path, dict(fingerprint, sha256=sha256))
+        except OSError:
+            pass
+
+    df.attrs['mdrm_version'] = sha256
+    return df
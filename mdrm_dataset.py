@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+MDRM Dataset Snapshots and Release Diffs
+
+This module bundles one MDRM release with every index the explorer builds
+over it into an immutable snapshot, diffs two releases by
+(Mnemonic, Item Code, Start Date), and watches the CSV so a new release can
+be swapped in while the server keeps answering requests from the old one.
+Under gunicorn a single worker loads each new release and the others map its
+columnar cache.
+
+Run it as a script to diff two release files:
+
+    python mdrm_dataset.py OLD_MDRM_CSV.csv NEW_MDRM_CSV.csv -o changes.csv
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from mdrm_asof import AsOfIndex
+from mdrm_data import CSV_PATH, cache_file, default_cache_dir, load_mdrm, read_cache, write_atomic
+from mdrm_graph import RelationshipGraph
+from mdrm_index import MDRMIndex
+from mdrm_search import load_search_index
+from mdrm_table import TableStore
+from mdrm_typeahead import TypeaheadIndex
+
+# Rows are matched across releases on these columns
+KEY_COLUMNS = ['Mnemonic', 'Item Code', 'Start Date']
+
+# Columns compared for rows present in both releases
+COMPARE_COLUMNS = ['End Date', 'Item Name', 'Confidentiality', 'ItemType',
+                   'Reporting Form', 'Description', 'SeriesGlossary']
+
+# Kinds of change reported, in report order
+CHANGE_KINDS = ['added', 'removed', 'ended', 'modified']
+
+# Files in the cache directory through which serving processes share reloads:
+# the lock held by the one process that loads new releases, and the release it
+# last published
+LOCK_NAME = 'reload.lock'
+RELEASE_NAME = 'release.json'
+
+
+class MDRMDataset:
+    """One MDRM release and the indexes built over it; never modified after construction."""
+
+    def __init__(self, df, table_columns, cache_dir=None):
+        self.df = df
+        self.version = df.attrs.get('mdrm_version')
+        self.index = MDRMIndex(df)
+        self.search_index = load_search_index(df, cache_dir)
+        self.table_store = TableStore(df, table_columns)
+        self.as_of_index = AsOfIndex(df)
+        self.graph = RelationshipGraph(df)
+        self.typeahead = TypeaheadIndex(df, self.index)
+
+    def search_rows(self, criteria, stats=None):
+        """Return the row ids matching search criteria (ranked by relevance for full-text queries).
+
+        When a stats dict is given, its 'scanned' entry counts the rows examined.
+        """
+        criteria = dict(criteria)
+        text = criteria.pop('text', None)
+        as_of = criteria.pop('as_of', None)
+        stats = {} if stats is None else stats
+        rows = self.index.search(**criteria, stats=stats)
+        if as_of:
+            # Narrow the validity lookup to the chosen form or mnemonic when there is one
+            valid = self.as_of_index.valid_rows(as_of, reporting_form=criteria.get('reporting_form') or None,
+                                                mnemonic=criteria.get('mnemonic') or None)
+            rows = valid if rows is self.index.all_rows else np.intersect1d(rows, valid, assume_unique=True)
+            stats['scanned'] = stats.get('scanned', 0) + len(valid)
+        if text:
+            stats['scanned'] = stats.get('scanned', 0) + len(rows)
+            rows, _ = self.search_index.search(text, rows)
+        return rows
+
+
+def keyed_rows(df):
+    """Return the diff columns as plain values, with a counter making each key unique."""
+    frame = df[KEY_COLUMNS + COMPARE_COLUMNS].copy()
+    for column in frame.columns:
+        if not pd.api.types.is_datetime64_any_dtype(frame[column]):
+            frame[column] = frame[column].astype(object)
+    # Repeated keys are matched in file order
+    frame['occurrence'] = frame.groupby(KEY_COLUMNS, dropna=False).cumcount()
+    return frame
+
+
+def diff_releases(old, new):
+    """Compare two MDRM releases and return one change-log row per added, removed, ended or modified item."""
+    keys = KEY_COLUMNS + ['occurrence']
+    merged = keyed_rows(old).merge(keyed_rows(new), on=keys, how='outer',
+                                   suffixes=(' (old)', ' (new)'), indicator=True)
+
+    both = merged['_merge'] == 'both'
+    changed = {}
+    for column in COMPARE_COLUMNS:
+        before, after = merged[f'{column} (old)'], merged[f'{column} (new)']
+        changed[column] = both & ~((before == after) | (before.isna() & after.isna()))
+    changed = pd.DataFrame(changed)
+
+    # An item is "ended" when an open-ended (9999-12-31) row gets a real end date
+    was_active = merged['End Date (old)'].dt.year == 9999
+    now_active = merged['End Date (new)'].dt.year == 9999
+    ended = changed['End Date'] & was_active & ~now_active
+
+    kind = pd.Series(None, index=merged.index, dtype=object)
+    kind[changed.any(axis=1)] = 'modified'
+    kind[ended] = 'ended'
+    kind[merged['_merge'] == 'right_only'] = 'added'
+    kind[merged['_merge'] == 'left_only'] = 'removed'
+
+    rows = kind.notna()
+    log = merged.loc[rows, KEY_COLUMNS].copy()
+    log.insert(0, 'Change', kind[rows])
+    removed = merged['_merge'] == 'left_only'
+    for column in ['End Date', 'Item Name', 'Reporting Form']:
+        log[column] = merged[f'{column} (new)'].where(~removed, merged[f'{column} (old)'])[rows]
+    log['Old End Date'] = merged.loc[rows, 'End Date (old)']
+    columns = pd.Series('', index=log.index)
+    for column in COMPARE_COLUMNS:
+        columns += changed.loc[rows, column].map({True: column + ', ', False: ''})
+    log['Changed Columns'] = columns.str.rstrip(', ')
+    log['Change'] = pd.Categorical(log['Change'], categories=CHANGE_KINDS, ordered=True)
+    return log.sort_values(['Change'] + KEY_COLUMNS, kind='stable').reset_index(drop=True)
+
+
+def summarize_changes(log):
+    """Return a one-line summary of a change log."""
+    counts = log['Change'].value_counts()
+    return ', '.join(f"{kind}: {counts.get(kind, 0)}" for kind in CHANGE_KINDS)
+
+
+def file_state(path):
+    """Return (mtime, size) for a file, or None if it cannot be read."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime, stat.st_size
+
+
+def try_lock(path):
+    """Take an exclusive lock on a file without waiting.
+
+    Returns the open (locked) file, or None while another process holds the
+    lock. The lock is released when the file is closed or the process exits.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        # No other serving processes to coordinate with
+        return open(path, 'a')
+    f = open(path, 'a')
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+def read_release(cache_dir):
+    """Return the release last published to a cache directory, or None."""
+    try:
+        with open(os.path.join(cache_dir, RELEASE_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_release(cache_dir, version):
+    """Publish a release (whose columnar cache is written) to the other serving processes."""
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': version}, f)
+    write_atomic(os.path.join(cache_dir, RELEASE_NAME), write)
+
+
+class DatasetWatcher(threading.Thread):
+    """Keep a serving process on the current MDRM release, handing each new one to on_reload(dataset, change_log).
+
+    Of the processes sharing a cache directory, only the one holding its
+    reload lock polls the CSV, parses new releases into the columnar cache,
+    saves their change logs and publishes them in release.json. The others
+    poll that file and map the published Feather cache instead of parsing
+    the CSV themselves. When the lock holder exits, another process takes it.
+    """
+
+    def __init__(self, dataset, build, on_reload, csv_path=None, cache_dir=None, interval=60):
+        super().__init__(name='mdrm-dataset-watcher', daemon=True)
+        self.dataset = dataset
+        self.build = build
+        self.on_reload = on_reload
+        self.csv_path = csv_path or CSV_PATH
+        self.cache_dir = cache_dir or default_cache_dir(self.csv_path)
+        self.interval = interval
+        self.state = file_state(self.csv_path)
+        self.lock = None
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                if self.lock is None:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    self.lock = try_lock(os.path.join(self.cache_dir, LOCK_NAME))
+                if self.lock is not None:
+                    self.poll_csv()
+                else:
+                    self.poll_release()
+            except Exception as e:
+                print(f"Could not reload MDRM data from '{self.csv_path}': {e}")
+
+    def poll_csv(self):
+        """Reload once the CSV has changed and then stayed unchanged for an interval."""
+        state = file_state(self.csv_path)
+        if state is None or state == self.state:
+            return
+        # Wait for one quiet interval so a file still being copied isn't loaded
+        time.sleep(self.interval)
+        if file_state(self.csv_path) != state:
+            return
+        self.state = state
+        self.reload()
+
+    def reload(self):
+        """Load the current CSV, diff it against the loaded release and publish it."""
+        df = load_mdrm(self.csv_path, self.cache_dir)
+        if df.attrs.get('mdrm_version') == self.dataset.version:
+            return
+        old_version = self.dataset.version
+        log = self.swap(df)
+        try:
+            path = save_change_log(log, old_version, self.dataset.version, self.cache_dir)
+            print(f"Change log saved to '{path}'")
+        except OSError as e:
+            print(f"Could not save change log: {e}")
+        write_release(self.cache_dir, df.attrs['mdrm_version'])
+
+    def poll_release(self):
+        """Switch to the release the lock holder last published, mapping its columnar cache."""
+        release = read_release(self.cache_dir)
+        if release is None or release['version'] == self.dataset.version:
+            return
+        df = read_cache(cache_file(self.cache_dir, release['version']))
+        df.attrs['mdrm_version'] = release['version']
+        self.swap(df)
+
+    def swap(self, df):
+        """Index a new release, diff it against the loaded one and hand both to on_reload."""
+        dataset = self.build(df)
+        log = diff_releases(self.dataset.df, df)
+        print(f"Reloaded MDRM data ({summarize_changes(log)})")
+        self.on_reload(dataset, log)
+        self.dataset = dataset
+        return log
+
+
+def save_change_log(log, old_version, new_version, cache_dir=None):
+    """Write a change log to the cache directory and return its path.
+
+    The log is written under a temporary name and renamed into place, so a
+    reader never sees a partial file.
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f'changes-{old_version[:16]}-{new_version[:16]}.csv')
+    write_atomic(path, lambda tmp_path: log.to_csv(tmp_path, index=False))
+    return path
+
+
+def main():
+    """Diff two MDRM release files and write the change log."""
+    parser = argparse.ArgumentParser(description="Diff two MDRM_CSV.csv releases")
+    parser.add_argument('old_csv')
+    parser.add_argument('new_csv')
+    parser.add_argument('-o', '--output', default='mdrm_changes.csv', help="change log CSV to write")
+    args = parser.parse_args()
+
+    old = load_mdrm(args.old_csv, use_cache=False)
+    new = load_mdrm(args.new_csv, use_cache=False)
+    log = diff_releases(old, new)
+    log.to_csv(args.output, index=False)
+    print(summarize_changes(log))
+    print(f"Change log saved to '{args.output}'")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,278 +1,988 @@
+"""
+MDRM Explorer
 
-import pandas as pd
-import dash
-from dash import dcc, html, Input, Output, State, dash_table
-import plotly.express as px
-import plotly.graph_objects as go
+Dash web application for searching and browsing the MDRM data.
 
-# Read the CSV file with proper encoding
-# Skip the first row which contains "PUBLIC"
-print("Loading MDRM data...")
-df = pd.read_csv('/workspace/MDRM_CSV.csv', skiprows=1, encoding='utf-8')
-print(f"Loaded {len(df)} rows of data")
+create_app() loads the data, builds the dataset snapshot and wires the
+layout, callbacks and API routes onto a new Dash app; importing this module
+does none of that, and dash, plotly and pandas are only imported when an app
+is created, so the helpers here can be reused without the startup cost.
 
-# Initialize the Dash app
-app = dash.Dash(__name__, title="MDRM Explorer")
+    python mdrm_explorer.py
+"""
 
-# Define the layout
-app.layout = html.Div([
-    html.H1("Micro Data Reference Manual (MDRM) Explorer"),
+import functools
+import json
+import os
+import time
+
+from mdrm_export import EXPORT_FORMATS, ExportQueue, export_path, read_status
+from mdrm_metrics import metrics, stage, start_profiler
+
+# Columns shown in the results table
+TABLE_COLUMN_DEFS = [
+    {'name': 'Mnemonic', 'id': 'Mnemonic'},
+    {'name': 'Item Code', 'id': 'Item Code'},
+    {'name': 'Item Name', 'id': 'Item Name'},
+    {'name': 'Item Type', 'id': 'ItemType'},
+    {'name': 'Reporting Form', 'id': 'Reporting Form'},
+    {'name': 'Confidentiality', 'id': 'Confidentiality'},
+    {'name': 'Start Date', 'id': 'Start Date'},
+    {'name': 'End Date', 'id': 'End Date'},
+]
+TABLE_COLUMNS = [c['id'] for c in TABLE_COLUMN_DEFS]
+
+# Extra column with highlighted description snippets for full-text searches
+MATCH_COLUMN_DEF = {'name': 'Match', 'id': 'Match', 'presentation': 'markdown'}
+
+# Table inputs whose change sends the results table back to its first page
+RESTART_PAGING_PROPS = {'search-criteria.data', 'results-table.sort_by', 'results-table.filter_query'}
+
+# Columns of the related series table
+RELATED_COLUMN_DEFS = [
+    {'name': 'Series', 'id': 'Series'},
+    {'name': 'Shared Items', 'id': 'shared_items'},
+    {'name': 'Items', 'id': 'items'},
+    {'name': 'Jaccard', 'id': 'jaccard'},
+]
+
+# Typeahead field completing each kind of series in the Relationships tab
+RELATED_FIELDS = {'form': 'reporting_form', 'mnemonic': 'mnemonic'}
+
+# Number of related series listed in the Relationships tab
+RELATED_TOP = 20
+
+# Columns of the changes-between-dates table, and the most rows it lists
+CHANGES_COLUMN_DEFS = [{'name': 'Change', 'id': 'Change'}] + TABLE_COLUMN_DEFS
+CHANGES_SHOWN = 1000
+
+# Largest number of identifiers resolved by one /api/items request
+MAX_API_IDS = 10000
+
+# Completions offered while typing, and the most /api/complete returns
+SUGGESTIONS = 20
+MAX_API_SUGGESTIONS = 100
+
+# Seconds of no typing before a text box asks for suggestions
+TYPEAHEAD_DEBOUNCE = 0.2
+
+# Milliseconds between export progress updates in the page
+EXPORT_POLL_MS = 1000
+
+# Seconds between checks of the CSV for a new release (0 disables reloading)
+RELOAD_INTERVAL = int(os.environ.get('MDRM_RELOAD_INTERVAL', '0'))
+
+
+def build_dataset(df):
+    """Build the explorer's indexes over a loaded release."""
+    from mdrm_data import default_cache_dir
+    from mdrm_dataset import MDRMDataset
+
+    # Filter index, full-text index (cached on disk) and the presorted table columns
+    return MDRMDataset(df, TABLE_COLUMNS, default_cache_dir())
+
+
+class ExplorerState:
+    """The release an explorer app serves, with its change log and profiler.
+
+    Callbacks read `dataset` once per request, so a reload can swap in a new
+    snapshot without disturbing requests still using the old one.
+    """
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        # Change log between the last two releases seen by this server
+        self.last_changes = None
+        # Slow-request profiler (started with the background threads when MDRM_PROFILE_SLOW_MS is set)
+        self.profiler = None
+        # Background jobs writing full result sets to disk
+        self.exports = ExportQueue()
+
+    def swap_dataset(self, new_dataset, changes):
+        """Publish a reloaded release and its change log."""
+        self.dataset = new_dataset
+        self.last_changes = changes
+        # Cached results hold the old snapshot; drop them so it can be freed
+        stat_figures.cache_clear()
+        result_rows.cache_clear()
+
+    def start_background_threads(self):
+        """Start the reload watcher and the slow-request profiler, when enabled.
+
+        Threads don't survive a fork, so each serving process starts its own;
+        the watchers elect one of them to load new releases for all.
+        """
+        if RELOAD_INTERVAL > 0:
+            from mdrm_dataset import DatasetWatcher
+            DatasetWatcher(self.dataset, build_dataset, self.swap_dataset, interval=RELOAD_INTERVAL).start()
+        self.profiler = start_profiler()
+
+
+def serve_layout(data):
+    """Build the page layout, with dropdown options from a release."""
+    from dash import dash_table, dcc, html
+
+    return html.Div([
+        html.H1("Micro Data Reference Manual (MDRM) Explorer"),
     
-    html.Div([
         html.Div([
-            html.H3("About MDRM"),
-            html.P("""
-                The Micro Data Reference Manual (MDRM) is a catalog of micro and macro data collected from 
-                depository institutions and other respondents. The data are organized into reports, or data series, 
-                and consist primarily of financial and structure data.
-            """),
-            html.P("""
-                Each data series has a four-letter mnemonic for data transmission and storage. Each variable 
-                within a data series is assigned a number (usually 4 digits). The combination (e.g., SVGL2170) 
-                references a specific data item on a specific series.
-            """),
-        ], style={'width': '100%', 'marginBottom': '20px'}),
+            html.Div([
+                html.H3("About MDRM"),
+                html.P("""
+                    The Micro Data Reference Manual (MDRM) is a catalog of micro and macro data collected from 
+                    depository institutions and other respondents. The data are organized into reports, or data series, 
+                    and consist primarily of financial and structure data.
+                """),
+                html.P("""
+                    Each data series has a four-letter mnemonic for data transmission and storage. Each variable 
+                    within a data series is assigned a number (usually 4 digits). The combination (e.g., SVGL2170) 
+                    references a specific data item on a specific series.
+                """),
+            ], style={'width': '100%', 'marginBottom': '20px'}),
         
-        html.Div([
-            html.H3("Search and Filter"),
             html.Div([
+                html.H3("Search and Filter"),
+                html.Div([
+                    html.Div([
+                        html.Label("Mnemonic:"),
+                        dcc.Dropdown(
+                            id='mnemonic-dropdown',
+                            options=completion_options(data, 'mnemonic', ''),
+                            placeholder="Type or select a mnemonic",
+                        ),
+                    ], style={'width': '30%', 'display': 'inline-block', 'marginRight': '10px'}),
+                
+                    html.Div([
+                        html.Label("Item Code:"),
+                        dcc.Input(
+                            id='item-code-input',
+                            type='text',
+                            placeholder="Enter item code",
+                            list='item-code-suggestions',
+                            debounce=TYPEAHEAD_DEBOUNCE,
+                        ),
+                        html.Datalist(id='item-code-suggestions'),
+                    ], style={'width': '30%', 'display': 'inline-block', 'marginRight': '10px'}),
+                
+                    html.Div([
+                        html.Label("Item Type:"),
+                        dcc.Dropdown(
+                            id='item-type-dropdown',
+                            options=[
+                                {'label': 'Financial/reported (F)', 'value': 'F'},
+                                {'label': 'Derived (D)', 'value': 'D'},
+                                {'label': 'Percentage (P)', 'value': 'P'},
+                                {'label': 'Rate (R)', 'value': 'R'},
+                                {'label': 'Structure (S)', 'value': 'S'},
+                                {'label': 'Projected (J)', 'value': 'J'},
+                            ],
+                            placeholder="Select item type",
+                        ),
+                    ], style={'width': '30%', 'display': 'inline-block'}),
+                ], style={'marginBottom': '10px'}),
+            
                 html.Div([
-                    html.Label("Mnemonic:"),
+                    html.Label("Reporting Form:"),
                     dcc.Dropdown(
-                        id='mnemonic-dropdown',
-                        options=[{'label': m, 'value': m} for m in sorted(df['Mnemonic'].unique())],
-                        placeholder="Select a mnemonic",
+                        id='reporting-form-dropdown',
+                        options=completion_options(data, 'reporting_form', ''),
+                        placeholder="Type or select a reporting form",
                     ),
-                ], style={'width': '30%', 'display': 'inline-block', 'marginRight': '10px'}),
-                
+                ], style={'marginBottom': '10px'}),
+            
                 html.Div([
-                    html.Label("Item Code:"),
+                    html.Label("Confidentiality:"),
+                    dcc.RadioItems(
+                        id='confidentiality-radio',
+                        options=[
+                            {'label': 'All', 'value': 'all'},
+                            {'label': 'Public (N)', 'value': 'N'},
+                            {'label': 'Confidential (Y)', 'value': 'Y'},
+                        ],
+                        value='all',
+                        inline=True
+                    ),
+                ], style={'marginBottom': '10px'}),
+            
+                html.Div([
+                    html.Label("Valid on date:"),
+                    dcc.DatePickerSingle(
+                        id='as-of-date',
+                        placeholder="Any date",
+                        display_format='YYYY-MM-DD',
+                        clearable=True,
+                    ),
+                ], style={'marginBottom': '10px'}),
+            
+                html.Div([
+                    html.Label("Full-text search (Item Name, Description, Series Glossary):"),
                     dcc.Input(
-                        id='item-code-input',
+                        id='text-search-input',
                         type='text',
-                        placeholder="Enter item code",
+                        placeholder="e.g. allowance for loan losses",
+                        list='item-name-suggestions',
+                        debounce=TYPEAHEAD_DEBOUNCE,
+                        style={'width': '100%'},
                     ),
-                ], style={'width': '30%', 'display': 'inline-block', 'marginRight': '10px'}),
-                
+                    html.Datalist(id='item-name-suggestions'),
+                ], style={'marginBottom': '10px'}),
+            
+                html.Button('Search', id='search-button', n_clicks=0, style={'marginTop': '10px'}),
+                html.Button('Reset', id='reset-button', n_clicks=0, style={'marginTop': '10px', 'marginLeft': '10px'}),
+            ], style={'width': '100%', 'marginBottom': '20px'}),
+        
+            html.Div([
+                html.H3("Results"),
+                html.Div(id='results-count'),
                 html.Div([
-                    html.Label("Item Type:"),
-                    dcc.Dropdown(
-                        id='item-type-dropdown',
+                    dcc.RadioItems(
+                        id='export-format-radio',
                         options=[
-                            {'label': 'Financial/reported (F)', 'value': 'F'},
-                            {'label': 'Derived (D)', 'value': 'D'},
-                            {'label': 'Percentage (P)', 'value': 'P'},
-                            {'label': 'Rate (R)', 'value': 'R'},
-                            {'label': 'Structure (S)', 'value': 'S'},
-                            {'label': 'Projected (J)', 'value': 'J'},
+                            {'label': 'CSV', 'value': 'csv'},
+                            {'label': 'Parquet', 'value': 'parquet'},
                         ],
-                        placeholder="Select item type",
+                        value='csv',
+                        inline=True,
+                        style={'display': 'inline-block'}
                     ),
-                ], style={'width': '30%', 'display': 'inline-block'}),
-            ], style={'marginBottom': '10px'}),
-            
-            html.Div([
-                html.Label("Reporting Form:"),
-                dcc.Dropdown(
-                    id='reporting-form-dropdown',
-                    options=[{'label': rf, 'value': rf} for rf in sorted(df['Reporting Form'].dropna().unique())],
-                    placeholder="Select a reporting form",
+                    html.Button('Export all results', id='export-button', n_clicks=0, style={'marginLeft': '10px'}),
+                    html.Span(id='export-status', style={'marginLeft': '10px'}),
+                    dcc.Store(id='export-job'),
+                    dcc.Interval(id='export-interval', interval=EXPORT_POLL_MS, disabled=True),
+                ], style={'marginTop': '10px', 'marginBottom': '10px'}),
+                dcc.Store(id='search-criteria'),
+                dash_table.DataTable(
+                    id='results-table',
+                    columns=TABLE_COLUMN_DEFS,
+                    page_current=0,
+                    page_size=10,
+                    page_action="custom",
+                    style_table={'overflowX': 'auto'},
+                    style_cell={
+                        'textAlign': 'left',
+                        'padding': '5px',
+                        'whiteSpace': 'normal',
+                        'height': 'auto',
+                    },
+                    style_header={
+                        'backgroundColor': 'lightgrey',
+                        'fontWeight': 'bold'
+                    },
+                    style_data_conditional=[
+                        {
+                            'if': {'row_index': 'odd'},
+                            'backgroundColor': 'rgb(248, 248, 248)'
+                        }
+                    ],
+                    filter_action="custom",
+                    filter_query='',
+                    sort_action="custom",
+                    sort_mode="multi",
+                    sort_by=[],
                 ),
-            ], style={'marginBottom': '10px'}),
-            
+            ], style={'width': '100%', 'marginBottom': '20px'}),
+        
+            html.Div([
+                html.H3("Item Details"),
+                html.Div(id='item-details', style={'whiteSpace': 'pre-wrap', 'border': '1px solid #ddd', 'padding': '10px', 'backgroundColor': '#f9f9f9'})
+            ], style={'width': '100%'}),
+        
             html.Div([
-                html.Label("Confidentiality:"),
+                html.H3("Statistics"),
                 dcc.RadioItems(
-                    id='confidentiality-radio',
+                    id='stats-scope-radio',
                     options=[
-                        {'label': 'All', 'value': 'all'},
-                        {'label': 'Public (N)', 'value': 'N'},
-                        {'label': 'Confidential (Y)', 'value': 'Y'},
+                        {'label': 'Whole dataset', 'value': 'all'},
+                        {'label': 'Current search results', 'value': 'search'},
                     ],
                     value='all',
                     inline=True
                 ),
-            ], style={'marginBottom': '10px'}),
-            
-            html.Button('Search', id='search-button', n_clicks=0, style={'marginTop': '10px'}),
-            html.Button('Reset', id='reset-button', n_clicks=0, style={'marginTop': '10px', 'marginLeft': '10px'}),
-        ], style={'width': '100%', 'marginBottom': '20px'}),
-        
-        html.Div([
-            html.H3("Results"),
-            html.Div(id='results-count'),
-            dash_table.DataTable(
-                id='results-table',
-                columns=[
-                    {'name': 'Mnemonic', 'id': 'Mnemonic'},
-                    {'name': 'Item Code', 'id': 'Item Code'},
-                    {'name': 'Item Name', 'id': 'Item Name'},
-                    {'name': 'Item Type', 'id': 'ItemType'},
-                    {'name': 'Reporting Form', 'id': 'Reporting Form'},
-                    {'name': 'Confidentiality', 'id': 'Confidentiality'},
-                    {'name': 'Start Date', 'id': 'Start Date'},
-                    {'name': 'End Date', 'id': 'End Date'},
-                ],
-                page_size=10,
-                style_table={'overflowX': 'auto'},
-                style_cell={
-                    'textAlign': 'left',
-                    'padding': '5px',
-                    'whiteSpace': 'normal',
-                    'height': 'auto',
-                },
-                style_header={
-                    'backgroundColor': 'lightgrey',
-                    'fontWeight': 'bold'
-                },
-                style_data_conditional=[
-                    {
-                        'if': {'row_index': 'odd'},
-                        'backgroundColor': 'rgb(248, 248, 248)'
-                    }
-                ],
-                filter_action="native",
-                sort_action="native",
-            ),
-        ], style={'width': '100%', 'marginBottom': '20px'}),
-        
-        html.Div([
-            html.H3("Item Details"),
-            html.Div(id='item-details', style={'whiteSpace': 'pre-wrap', 'border': '1px solid #ddd', 'padding': '10px', 'backgroundColor': '#f9f9f9'})
-        ], style={'width': '100%'}),
-        
-        html.Div([
-            html.H3("Statistics"),
-            dcc.Tabs([
-                dcc.Tab(label="Mnemonics Distribution", children=[
-                    dcc.Graph(id='mnemonics-chart')
-                ]),
-                dcc.Tab(label="Item Types Distribution", children=[
-                    dcc.Graph(id='item-types-chart')
-                ]),
-                dcc.Tab(label="Confidentiality Distribution", children=[
-                    dcc.Graph(id='confidentiality-chart')
-                ]),
-            ])
-        ], style={'width': '100%', 'marginTop': '20px'}),
-    ], style={'margin': '0 auto', 'maxWidth': '1200px', 'padding': '20px'})
-])
-
-# Define callbacks
-@app.callback(
-    [Output('results-table', 'data'),
-     Output('results-count', 'children'),
-     Output('mnemonics-chart', 'figure'),
-     Output('item-types-chart', 'figure'),
-     Output('confidentiality-chart', 'figure')],
-    [Input('search-button', 'n_clicks'),
-     Input('reset-button', 'n_clicks')],
-    [State('mnemonic-dropdown', 'value'),
-     State('item-code-input', 'value'),
-     State('item-type-dropdown', 'value'),
-     State('reporting-form-dropdown', 'value'),
-     State('confidentiality-radio', 'value')]
-)
-def update_results(search_clicks, reset_clicks, mnemonic, item_code, item_type, reporting_form, confidentiality):
-    ctx = dash.callback_context
-    
-    if not ctx.triggered:
-        button_id = 'No clicks yet'
-    else:
-        button_id = ctx.triggered[0]['prop_id'].split('.')[0]
-    
-    if button_id == 'reset-button':
-        filtered_df = df.head(10)  # Just show first 10 rows on reset
-        count_text = f"Showing first 10 rows (total dataset: {len(df)} rows)"
-    else:
-        # Apply filters
-        filtered_df = df.copy()
-        
-        if mnemonic:
-            filtered_df = filtered_df[filtered_df['Mnemonic'] == mnemonic]
-        
-        if item_code:
-            filtered_df = filtered_df[filtered_df['Item Code'].str.contains(item_code, na=False, case=False)]
-        
-        if item_type:
-            filtered_df = filtered_df[filtered_df['ItemType'] == item_type]
-        
-        if reporting_form:
-            filtered_df = filtered_df[filtered_df['Reporting Form'] == reporting_form]
-        
-        if confidentiality != 'all':
-            filtered_df = filtered_df[filtered_df['Confidentiality'] == confidentiality]
-        
-        # Limit to 1000 rows for performance
-        if len(filtered_df) > 1000:
-            count_text = f"Found {len(filtered_df)} rows (showing first 1000)"
-            filtered_df = filtered_df.head(1000)
-        else:
-            count_text = f"Found {len(filtered_df)} rows"
-    
-    # Create charts
+                dcc.Store(id='charts-shown'),
+                dcc.Tabs([
+                    dcc.Tab(label="Mnemonics Distribution", children=[
+                        dcc.Graph(id='mnemonics-chart')
+                    ]),
+                    dcc.Tab(label="Item Types Distribution", children=[
+                        dcc.Graph(id='item-types-chart')
+                    ]),
+                    dcc.Tab(label="Confidentiality Distribution", children=[
+                        dcc.Graph(id='confidentiality-chart')
+                    ]),
+                    dcc.Tab(label="Relationships", children=[
+                        html.Div([
+                            dcc.RadioItems(
+                                id='related-kind-radio',
+                                options=[
+                                    {'label': 'Reporting Forms', 'value': 'form'},
+                                    {'label': 'Mnemonics', 'value': 'mnemonic'},
+                                ],
+                                value='form',
+                                inline=True
+                            ),
+                            html.Div([
+                                dcc.Dropdown(
+                                    id='related-series-dropdown',
+                                    options=completion_options(data, RELATED_FIELDS['form'], ''),
+                                    placeholder="Type or select a series",
+                                ),
+                            ], style={'width': '30%', 'display': 'inline-block', 'marginRight': '10px'}),
+                            dcc.RadioItems(
+                                id='related-by-radio',
+                                options=[
+                                    {'label': 'Most shared items', 'value': 'shared'},
+                                    {'label': 'Most similar (Jaccard)', 'value': 'jaccard'},
+                                ],
+                                value='shared',
+                                inline=True,
+                                style={'display': 'inline-block'}
+                            ),
+                            html.Div(id='related-count', style={'marginTop': '10px'}),
+                            dash_table.DataTable(
+                                id='related-table',
+                                columns=RELATED_COLUMN_DEFS,
+                                page_size=10,
+                                style_cell={'textAlign': 'left', 'padding': '5px'},
+                                style_header={'backgroundColor': 'lightgrey', 'fontWeight': 'bold'},
+                            ),
+                            html.Div([
+                                html.Label("Series using Item Code:"),
+                                dcc.Input(id='item-series-input', type='text', placeholder="Enter item code",
+                                          debounce=True, style={'marginLeft': '10px'}),
+                                html.Div(id='item-series', style={'whiteSpace': 'pre-wrap', 'marginTop': '10px'}),
+                            ], style={'marginTop': '20px'}),
+                        ], style={'padding': '10px'}),
+                    ]),
+                    dcc.Tab(label="Changes Between Dates", children=[
+                        html.Div([
+                            html.Label("Items added and ended between:"),
+                            dcc.DatePickerRange(
+                                id='changes-date-range',
+                                display_format='YYYY-MM-DD',
+                                clearable=True,
+                                style={'marginLeft': '10px'},
+                            ),
+                            html.Div("Narrowed to the Mnemonic and Reporting Form selected above.",
+                                     style={'marginTop': '5px'}),
+                            html.Div(id='changes-count', style={'marginTop': '10px'}),
+                            dash_table.DataTable(
+                                id='changes-table',
+                                columns=CHANGES_COLUMN_DEFS,
+                                page_size=10,
+                                style_table={'overflowX': 'auto'},
+                                style_cell={'textAlign': 'left', 'padding': '5px'},
+                                style_header={'backgroundColor': 'lightgrey', 'fontWeight': 'bold'},
+                            ),
+                        ], style={'padding': '10px'}),
+                    ]),
+                ])
+            ], style={'width': '100%', 'marginTop': '20px'}),
+        ], style={'margin': '0 auto', 'maxWidth': '1200px', 'padding': '20px'})
+    ])
+
+
+def build_stat_figures(data, rows):
+    """Build the statistics charts of a dataset over the given row ids (all rows if None)."""
+    with stage('update_charts', 'value_counts'):
+        top_mnemonics = data.index.value_counts('Mnemonic', rows).head(10)
+        item_types = data.index.value_counts('ItemType', rows)
+        conf = data.index.value_counts('Confidentiality', rows)
+
+    with stage('update_charts', 'figures'):
+        return stat_figure_dicts(top_mnemonics, item_types, conf)
+
+
+def stat_figure_dicts(top_mnemonics, item_types, conf):
+    """Build the three statistics charts from their value counts."""
+    import plotly.express as px
+
     # Mnemonics chart
-    top_mnemonics = df['Mnemonic'].value_counts().head(10)
     mnemonics_fig = px.bar(
-        x=top_mnemonics.index, 
+        x=top_mnemonics.index,
         y=top_mnemonics.values,
         labels={'x': 'Mnemonic', 'y': 'Count'},
         title='Top 10 Most Common Mnemonics'
     )
-    
+
     # Item Types chart
-    item_types = df['ItemType'].value_counts()
     item_types_fig = px.pie(
-        values=item_types.values, 
+        values=item_types.values,
         names=item_types.index,
         title='Distribution of Item Types'
     )
-    
+
     # Confidentiality chart
-    conf = df['Confidentiality'].value_counts()
     conf_fig = px.pie(
-        values=conf.values, 
+        values=conf.values,
         names=conf.index,
         title='Distribution of Confidentiality',
         color_discrete_map={'Y': 'red', 'N': 'green', 'n': 'yellow'}
     )
-    
-    return filtered_df.to_dict('records'), count_text, mnemonics_fig, item_types_fig, conf_fig
-
-@app.callback(
-    Output('item-details', 'children'),
-    [Input('results-table', 'active_cell')],
-    [State('results-table', 'data')]
-)
-def display_item_details(active_cell, data):
-    if active_cell and data:
-        row = data[active_cell['row']]
-        mnemonic = row['Mnemonic']
-        item_code = row['Item Code']
-        
-        # Get the full row from the original dataframe
-        item_data = df[(df['Mnemonic'] == mnemonic) & (df['Item Code'] == item_code)]
-        
-        if not item_data.empty:
-            item = item_data.iloc[0]
-            details = f"""
-MDRM Identifier: {item['Mnemonic']}{item['Item Code']}
+
+    return mnemonics_fig.to_dict(), item_types_fig.to_dict(), conf_fig.to_dict()
+
+
+@functools.lru_cache(maxsize=256)
+def stat_figures(data, criteria):
+    """Return the statistics figures for a dataset snapshot and search criteria (memoized)."""
+    rows = None
+    if criteria is not None:
+        with stage('update_charts', 'filter'):
+            rows = search_rows(data, criteria, 'update_charts')
+    return build_stat_figures(data, rows)
+
+
+# Each cached result holds up to one row id (8 bytes) per row of the release,
+# about 0.7 MB for the full MDRM, so keep only the last few searches
+@functools.lru_cache(maxsize=16)
+def result_rows(data, criteria, filter_query, sort_by):
+    """Return the ordered row ids for a search, table filter and sort (memoized)."""
+    if criteria is None:
+        rows = data.index.all_rows[:10]  # Just show first 10 rows on reset
+    else:
+        rows = search_rows(data, criteria, 'update_table')
+    if filter_query:
+        metrics.inc('mdrm_rows_scanned_total', len(rows), callback='update_table')
+    rows = data.table_store.filter(rows, filter_query)
+    return data.table_store.sort(rows, [{'column_id': c, 'direction': d} for c, d in sort_by])
+
+
+def search_rows(data, criteria, callback):
+    """Run a search and count the rows it scanned and returned."""
+    stats = {}
+    rows = data.search_rows(criteria, stats)
+    metrics.inc('mdrm_rows_scanned_total', stats.get('scanned', 0), callback=callback)
+    metrics.inc('mdrm_rows_returned_total', len(rows), callback=callback)
+    return rows
+
+
+def table_page(data, criteria, page_current, page_size, sort_by, filter_query):
+    """Return the results table page (records, page count, columns and count text) for a search."""
+    from mdrm_search import snippet
+
+    text = criteria.get('text') if criteria else None
+    if criteria is not None:
+        criteria = tuple(sorted(criteria.items()))
+    sort_by = tuple((s['column_id'], s['direction']) for s in sort_by or [])
+    with stage('update_table', 'filter'):
+        rows = result_rows(data, criteria, filter_query or '', sort_by)
+
+    # Only the visible page is sent to the browser
+    page_current = page_current or 0
+    page = rows[page_current * page_size:(page_current + 1) * page_size]
+    page_count = max(1, -(-len(rows) // page_size))
+
+    if criteria is None:
+        count_text = f"Showing first {len(rows)} rows (total dataset: {len(data.df)} rows)"
+    else:
+        count_text = f"Found {len(rows)} rows"
+
+    with stage('update_table', 'serialize'):
+        records = data.table_store.records(page)
+    columns = TABLE_COLUMN_DEFS
+    if text:
+        # Full-text results are ranked; show where the query matched
+        columns = TABLE_COLUMN_DEFS + [MATCH_COLUMN_DEF]
+        with stage('update_table', 'snippets'):
+            descriptions = data.df['Description'].iloc[page]
+            for record, description in zip(records, descriptions):
+                record['Match'] = snippet(description, text)
+    return records, page_count, columns, count_text
+
+
+def export_rows(data, criteria, filter_query, sort_by):
+    """Return every row of a search (the whole release without one), table filtered and sorted."""
+    if criteria is None:
+        rows = data.index.all_rows
+    else:
+        rows = search_rows(data, criteria, 'export_results')
+    rows = data.table_store.filter(rows, filter_query)
+    return data.table_store.sort(rows, sort_by)
+
+
+def start_export(state, criteria, fmt, sort_by, filter_query):
+    """Queue an export of the full result set of the current search and return its job id."""
+    data = state.dataset
+    # The search runs on the export pool too; the job keeps the snapshot it started from
+    return state.exports.submit(data.df, lambda: export_rows(data, criteria, filter_query or '', sort_by or []), fmt)
+
+
+def export_progress(state, job_id):
+    """Return the export status text (with a download link when done) and whether the job has finished."""
+    from dash import html
+
+    status = read_status(job_id, state.exports.export_dir)
+    if status is None:
+        return "Export not found", True
+    if status['state'] == 'queued':
+        return "Export queued...", False
+    if status['state'] == 'running':
+        percent = 100 * status['written'] // max(status['rows'], 1)
+        return f"Exporting {status['written']} of {status['rows']} rows ({percent}%)...", False
+    if status['state'] == 'failed':
+        return f"Export failed: {status['error']}", True
+    return [f"Exported {status['rows']} rows. ",
+            html.A("Download", href=f"/export/{job_id}")], True
+
+
+def item_details(data, active_cell, rows):
+    """Return the details panel text for the selected results table row."""
+    if active_cell and rows:
+        row = rows[active_cell['row']]
+        mdrm_id = f"{row['Mnemonic']}{row['Item Code']}"
+
+        # Every dated version of the identifier, oldest first
+        with stage('display_item_details', 'lookup'):
+            versions = data.df.iloc[data.index.lookup(mdrm_id)]
+        metrics.inc('mdrm_rows_returned_total', len(versions), callback='display_item_details')
+
+        if not versions.empty:
+            with stage('display_item_details', 'format'):
+                return format_item_details(mdrm_id, versions)
+
+    return "Select a row from the results table to view details"
+
+
+def completions(data, field, prefix, k=SUGGESTIONS):
+    """Return the top-k completions (value, rows) of a prefix for a field and the number of matches."""
+    with stage('typeahead', 'complete'):
+        found, total = data.typeahead.complete(field, prefix, k)
+    metrics.inc('mdrm_rows_returned_total', len(found), callback='typeahead')
+    return found, total
+
+
+def completion_options(data, field, search_value, value=None):
+    """Return the dropdown options completing what was typed, keeping the selected value."""
+    found, _ = completions(data, field, search_value)
+    options = [{'label': f"{v} ({rows} rows)", 'value': v} for v, rows in found]
+    if value and value not in [v for v, _ in found]:
+        options.insert(0, {'label': value, 'value': value})
+    return options
+
+
+def completion_datalist(data, field, prefix):
+    """Return the datalist entries completing what was typed in a text box."""
+    from dash import html
+
+    if not prefix or not prefix.strip():
+        return []
+    found, _ = completions(data, field, prefix.strip())
+    return [html.Option(value=v, label=f"{rows} rows") for v, rows in found]
+
+
+def related_series(data, kind, name, by):
+    """Return the related series table rows and summary for a Mnemonic or Reporting Form."""
+    graph = data.graph.graphs[kind]
+    if not name or name not in graph:
+        return [], "Select a series to list the series sharing its Item Codes"
+
+    with stage('update_related', 'neighbors'):
+        neighbors = graph.neighbors(name, k=RELATED_TOP, by=by)
+    metrics.inc('mdrm_rows_returned_total', len(neighbors), callback='update_related')
+
+    with stage('update_related', 'serialize'):
+        rows = neighbors.rename(columns={graph.column: 'Series'}).round({'jaccard': 4}).to_dict('records')
+    count_text = f"{name} uses {graph.sizes[graph.position(name)]} Item Codes; {len(rows)} related series shown"
+    return rows, count_text
+
+
+def item_series_text(data, item_code):
+    """Return the text listing the Mnemonics and Reporting Forms that use an Item Code."""
+    if not item_code or not item_code.strip():
+        return ""
+    item_code = item_code.strip()
+    with stage('display_item_series', 'lookup'):
+        found = data.graph.series_with_item(item_code)
+    lines = []
+    for kind, series in found.items():
+        lines.append(f"{data.graph.graphs[kind].column}s ({len(series)}): {', '.join(series) or 'none'}")
+    return "\n".join(lines)
+
+
+def date_changes(data, start_date, end_date, mnemonic=None, reporting_form=None):
+    """Return the changes table rows and summary for the items added and ended between two dates."""
+    if not start_date or not end_date:
+        return [], "Pick two dates to list the items added and ended between them"
+    start_date, end_date = start_date[:10], end_date[:10]
+
+    with stage('update_changes', 'lookup'):
+        added, removed = data.as_of_index.changes(start_date, end_date, reporting_form=reporting_form or None,
+                                                  mnemonic=mnemonic or None)
+    metrics.inc('mdrm_rows_returned_total', len(added) + len(removed), callback='update_changes')
+
+    with stage('update_changes', 'serialize'):
+        rows = [dict(record, Change='added') for record in data.table_store.records(added[:CHANGES_SHOWN])]
+        rows += [dict(record, Change='ended')
+                 for record in data.table_store.records(removed[:CHANGES_SHOWN - len(rows)])]
+    count_text = f"{len(added)} items added and {len(removed)} ended between {start_date} and {end_date}"
+    if len(rows) < len(added) + len(removed):
+        count_text += f" (first {len(rows)} shown)"
+    return rows, count_text
+
+
+def format_item_details(mdrm_id, versions):
+    """Format every version of an identifier for the details panel."""
+    from mdrm_data import format_date
+
+    details = f"""
+MDRM Identifier: {mdrm_id}
+Versions: {len(versions)}
+"""
+    for number, (_, item) in enumerate(versions.iterrows(), start=1):
+        details += f"""
+--- Version {number}: {format_date(item['Start Date'])} to {format_date(item['End Date'])} ---
 Item Name: {item['Item Name']}
 Reporting Form: {item['Reporting Form']}
 Item Type: {item['ItemType']}
 Confidentiality: {item['Confidentiality']}
-Start Date: {item['Start Date']}
-End Date: {item['End Date']}
+Start Date: {format_date(item['Start Date'])}
+End Date: {format_date(item['End Date'])}
 
 Description:
 {item['Description']}
-
+"""
+    details += f"""
 Series Glossary:
-{item['SeriesGlossary']}
+{versions['SeriesGlossary'].iloc[-1]}
             """
-            return details
-    
-    return "Select a row from the results table to view details"
+    return details
+
+
+def item_records(df, rows):
+    """Convert rows to JSON-ready dicts (without the mnemonic-level glossary)."""
+    from mdrm_data import format_date
+
+    items = df.iloc[rows].drop(columns='SeriesGlossary')
+    items = items.astype(object).where(items.notna(), None)
+    for column in ['Start Date', 'End Date']:
+        items[column] = items[column].map(format_date)
+    return items.to_dict('records')
+
+
+def items_by_id(data, ids):
+    """Resolve MDRM identifiers to the records of their versions."""
+    import numpy as np
+
+    # Fetch all matching rows at once, then split them back per identifier
+    matches = data.index.lookup_many(ids)
+    with stage('api_items', 'serialize'):
+        records = item_records(data.df, np.concatenate(matches)) if matches else []
+    results = {}
+    offset = 0
+    for mdrm_id, rows in zip(ids, matches):
+        results[mdrm_id] = records[offset:offset + len(rows)]
+        offset += len(rows)
+    return results
+
+
+def change_records(changes):
+    """Convert a change log to JSON-ready dicts."""
+    from mdrm_data import format_date
+
+    changes = changes.astype(object).where(changes.notna(), None)
+    for column in ['Start Date', 'End Date', 'Old End Date']:
+        changes[column] = changes[column].map(format_date)
+    return changes.to_dict('records')
+
+
+def create_app(df=None):
+    """Create the explorer's Dash app over a loaded release (the MDRM CSV by default).
+
+    The app's ExplorerState is available as app.state.
+    """
+    import dash
+    import flask
+    from dash import Input, Output, State
+
+    from mdrm_dataset import summarize_changes
+
+    if df is None:
+        from mdrm_data import load_mdrm
+        # Load the MDRM data (from the columnar cache when the CSV is unchanged)
+        df = load_mdrm()
+    state = ExplorerState(build_dataset(df))
+
+    app = dash.Dash(__name__, title="MDRM Explorer")
+    app.state = state
+    app.layout = lambda: serve_layout(state.dataset)
+
+    # Define callbacks
+    @app.callback(
+        Output('search-criteria', 'data'),
+        [Input('search-button', 'n_clicks'),
+         Input('reset-button', 'n_clicks')],
+        [State('mnemonic-dropdown', 'value'),
+         State('item-code-input', 'value'),
+         State('item-type-dropdown', 'value'),
+         State('reporting-form-dropdown', 'value'),
+         State('confidentiality-radio', 'value'),
+         State('text-search-input', 'value'),
+         State('as-of-date', 'date')]
+    )
+    def update_results(search_clicks, reset_clicks, mnemonic, item_code, item_type, reporting_form,
+                       confidentiality, text, as_of):
+        ctx = dash.callback_context
+
+        if not ctx.triggered:
+            button_id = 'No clicks yet'
+        else:
+            button_id = ctx.triggered[0]['prop_id'].split('.')[0]
+
+        if button_id == 'reset-button':
+            criteria = None
+        else:
+            criteria = {
+                'mnemonic': mnemonic,
+                'item_code': item_code,
+                'item_type': item_type,
+                'reporting_form': reporting_form,
+                'confidentiality': None if confidentiality == 'all' else confidentiality,
+                'text': text.strip() if text and text.strip() else None,
+                'as_of': as_of[:10] if as_of else None,
+            }
+
+        return criteria
+
+    @app.callback(
+        [Output('results-table', 'data'),
+         Output('results-table', 'page_count'),
+         Output('results-table', 'columns'),
+         Output('results-count', 'children'),
+         Output('results-table', 'page_current')],
+        [Input('search-criteria', 'data'),
+         Input('results-table', 'page_current'),
+         Input('results-table', 'page_size'),
+         Input('results-table', 'sort_by'),
+         Input('results-table', 'filter_query')]
+    )
+    def update_table(criteria, page_current, page_size, sort_by, filter_query):
+        # A new search, filter or sort always starts on the first page
+        if set(dash.callback_context.triggered_prop_ids) & RESTART_PAGING_PROPS:
+            page_current = 0
+        return table_page(state.dataset, criteria, page_current, page_size, sort_by, filter_query) + (page_current or 0,)
+
+    @app.callback(
+        [Output('mnemonics-chart', 'figure'),
+         Output('item-types-chart', 'figure'),
+         Output('confidentiality-chart', 'figure'),
+         Output('charts-shown', 'data')],
+        [Input('search-criteria', 'data'),
+         Input('stats-scope-radio', 'value')],
+        [State('charts-shown', 'data')]
+    )
+    def update_charts(criteria, scope, shown):
+        data = state.dataset
+        if scope == 'all' or not criteria:
+            criteria = None
+        else:
+            criteria = tuple(sorted(criteria.items()))
+
+        # The whole-dataset charts don't change between searches, so only send
+        # figures when the page isn't already showing them
+        key = json.dumps([data.version, criteria])
+        if key == shown:
+            return dash.no_update, dash.no_update, dash.no_update, dash.no_update
+        return (*stat_figures(data, criteria), key)
+
+    @app.callback(
+        Output('item-details', 'children'),
+        [Input('results-table', 'active_cell')],
+        [State('results-table', 'data')]
+    )
+    def display_item_details(active_cell, rows):
+        return item_details(state.dataset, active_cell, rows)
+
+    @app.callback(
+        Output('mnemonic-dropdown', 'options'),
+        [Input('mnemonic-dropdown', 'search_value')],
+        [State('mnemonic-dropdown', 'value')],
+        prevent_initial_call=True
+    )
+    def update_mnemonic_options(search_value, value):
+        return completion_options(state.dataset, 'mnemonic', search_value, value)
+
+    @app.callback(
+        Output('reporting-form-dropdown', 'options'),
+        [Input('reporting-form-dropdown', 'search_value')],
+        [State('reporting-form-dropdown', 'value')],
+        prevent_initial_call=True
+    )
+    def update_reporting_form_options(search_value, value):
+        return completion_options(state.dataset, 'reporting_form', search_value, value)
+
+    @app.callback(
+        Output('item-code-suggestions', 'children'),
+        [Input('item-code-input', 'value')],
+        prevent_initial_call=True
+    )
+    def update_item_code_suggestions(item_code):
+        return completion_datalist(state.dataset, 'item_code', item_code)
+
+    @app.callback(
+        Output('item-name-suggestions', 'children'),
+        [Input('text-search-input', 'value')],
+        prevent_initial_call=True
+    )
+    def update_item_name_suggestions(text):
+        return completion_datalist(state.dataset, 'item_name', text)
+
+    @app.callback(
+        Output('export-job', 'data'),
+        [Input('export-button', 'n_clicks')],
+        [State('search-criteria', 'data'),
+         State('export-format-radio', 'value'),
+         State('results-table', 'sort_by'),
+         State('results-table', 'filter_query')],
+        prevent_initial_call=True
+    )
+    def export_results(n_clicks, criteria, fmt, sort_by, filter_query):
+        return start_export(state, criteria, fmt, sort_by, filter_query)
+
+    @app.callback(
+        [Output('export-status', 'children'),
+         Output('export-interval', 'disabled')],
+        [Input('export-job', 'data'),
+         Input('export-interval', 'n_intervals')],
+        prevent_initial_call=True
+    )
+    def update_export_status(job_id, n_intervals):
+        return export_progress(state, job_id)
+
+    @app.callback(
+        [Output('related-series-dropdown', 'options'),
+         Output('related-series-dropdown', 'value')],
+        [Input('related-kind-radio', 'value'),
+         Input('related-series-dropdown', 'search_value')],
+        [State('related-series-dropdown', 'value')],
+        prevent_initial_call=True
+    )
+    def update_related_options(kind, search_value, value):
+        if 'related-kind-radio.value' in dash.callback_context.triggered_prop_ids:
+            # Switching between forms and mnemonics clears the selection
+            return completion_options(state.dataset, RELATED_FIELDS[kind], ''), None
+        return completion_options(state.dataset, RELATED_FIELDS[kind], search_value, value), dash.no_update
+
+    @app.callback(
+        [Output('related-table', 'data'),
+         Output('related-count', 'children')],
+        [Input('related-series-dropdown', 'value'),
+         Input('related-by-radio', 'value')],
+        [State('related-kind-radio', 'value')]
+    )
+    def update_related(name, by, kind):
+        return related_series(state.dataset, kind, name, by)
+
+    @app.callback(
+        Output('item-series', 'children'),
+        [Input('item-series-input', 'value')]
+    )
+    def display_item_series(item_code):
+        return item_series_text(state.dataset, item_code)
+
+    @app.callback(
+        [Output('changes-table', 'data'),
+         Output('changes-count', 'children')],
+        [Input('changes-date-range', 'start_date'),
+         Input('changes-date-range', 'end_date'),
+         Input('mnemonic-dropdown', 'value'),
+         Input('reporting-form-dropdown', 'value')]
+    )
+    def update_changes(start_date, end_date, mnemonic, reporting_form):
+        return date_changes(state.dataset, start_date, end_date, mnemonic, reporting_form)
+
+    @app.server.route('/api/items', methods=['GET', 'POST'])
+    def api_items():
+        """Resolve MDRM identifiers to their version history.
+
+        GET /api/items?id=RCON2170&id=BHCK2170 (or ids=RCON2170,BHCK2170)
+        POST /api/items with a JSON body {"ids": ["RCON2170", ...]}
+        Unknown identifiers map to an empty list.
+        """
+        if flask.request.method == 'POST':
+            body = flask.request.get_json(silent=True)
+            if body is None:
+                body = {}
+            # A body that isn't a JSON object fails the list check below
+            ids = body.get('ids', []) if isinstance(body, dict) else None
+        else:
+            ids = flask.request.args.getlist('id')
+            for value in flask.request.args.getlist('ids'):
+                ids.extend(i for i in value.split(',') if i)
+        if not isinstance(ids, list) or len(ids) > MAX_API_IDS or not all(isinstance(i, str) for i in ids):
+            return flask.jsonify(error=f"Expected a list of at most {MAX_API_IDS} string ids"), 400
+        return flask.jsonify(items=items_by_id(state.dataset, ids))
+
+    @app.server.route('/api/complete')
+    def api_complete():
+        """Complete a prefix of a Mnemonic, Reporting Form, Item Code, MDRM identifier or Item Name.
+
+        GET /api/complete?field=mdrm_id&q=RCON21&k=10
+        Returns the k completions with the most rows, and the number of matches.
+        """
+        data = state.dataset
+        field = flask.request.args.get('field', 'mdrm_id')
+        k = flask.request.args.get('k', SUGGESTIONS, type=int)
+        if field not in data.typeahead.fields:
+            return flask.jsonify(error=f"Unknown field; expected one of {', '.join(data.typeahead.fields)}"), 400
+        if not 0 < k <= MAX_API_SUGGESTIONS:
+            return flask.jsonify(error=f"Expected k between 1 and {MAX_API_SUGGESTIONS}"), 400
+        found, total = completions(data, field, flask.request.args.get('q', ''), k)
+        return flask.jsonify(completions=[{'value': v, 'rows': rows} for v, rows in found], total=total)
+
+    @app.server.route('/export/<job_id>')
+    def download_export(job_id):
+        status = read_status(job_id, state.exports.export_dir)
+        if status is None or status['state'] != 'done':
+            flask.abort(404)
+        fmt = status['format']
+        return flask.send_file(os.path.abspath(export_path(job_id, fmt, state.exports.export_dir)), mimetype=EXPORT_FORMATS[fmt],
+                               as_attachment=True, download_name=f'mdrm_results.{fmt}')
+
+    @app.server.route('/api/changes')
+    def api_changes():
+        """Return the change log between the last two releases loaded by this server."""
+        changes = state.last_changes
+        if changes is None:
+            return flask.jsonify(summary=None, changes=[])
+        return flask.jsonify(summary=summarize_changes(changes), changes=change_records(changes))
+
+    @app.server.before_request
+    def start_request_timer():
+        """Time Dash callback requests (and sample their stacks when profiling)."""
+        if flask.request.path.endswith('_dash-update-component'):
+            flask.g.started = time.perf_counter()
+            if state.profiler is not None:
+                state.profiler.begin()
+
+    @app.server.after_request
+    def record_request(response):
+        """Record the latency and response size of a Dash callback request."""
+        started = flask.g.pop('started', None)
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            body = flask.request.get_json(silent=True)
+            output = body.get('output') if isinstance(body, dict) else None
+            # Label only registered callbacks; the output string comes from the client
+            callback = app.callback_map.get(output, {}).get('callback') if isinstance(output, str) else None
+            name = getattr(callback, '__name__', None) or 'unknown'
+            metrics.observe('mdrm_request_seconds', elapsed, callback=name)
+            metrics.observe('mdrm_response_bytes', response.calculate_content_length() or 0, callback=name)
+            if state.profiler is not None:
+                path = state.profiler.end(name, elapsed)
+                if path:
+                    print(f"Slow request ({name}, {elapsed * 1000:.0f} ms); stacks saved to '{path}'")
+        return response
+
+    @app.server.route('/metrics')
+    def metrics_endpoint():
+        """Expose callback timings, row counts and response sizes for Prometheus."""
+        return flask.Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    # Warm the whole-dataset charts so the first page load doesn't build them
+    stat_figures(state.dataset, None)
+    return app
 
 if __name__ == '__main__':
+    app = create_app()
+    app.state.start_background_threads()
     app.run(debug=True, host='0.0.0.0', port=56085)
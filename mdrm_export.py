@@ -0,0 +1,160 @@
+"""
+MDRM Result Exports
+
+This module writes the full result set of an explorer search to CSV or
+Parquet as a background job. Jobs run on their own small thread pool, apart
+from the threads answering requests, and write the matching rows a chunk at a
+time, so memory is bounded by the chunk size rather than the result size and
+interactive requests get the interpreter between chunks. Each job records its
+progress in a small JSON file next to the export, so under gunicorn any worker
+can report it and serve the finished file, whichever worker ran the job.
+"""
+
+import json
+import os
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Directory holding the exports and their status files
+EXPORT_DIR = os.environ.get('MDRM_EXPORT_DIR', 'mdrm_exports')
+
+# Export jobs running at once in each process
+EXPORT_WORKERS = int(os.environ.get('MDRM_EXPORT_WORKERS', '1'))
+
+# Seconds an export is kept before it is deleted
+EXPORT_MAX_AGE = float(os.environ.get('MDRM_EXPORT_MAX_AGE', '86400'))
+
+# Rows converted and written per chunk
+CHUNK_ROWS = 20000
+
+# Export formats and their MIME types
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+JOB_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+
+def is_job_id(job_id):
+    """Check that a string is a job id (and so safe to use in a file name)."""
+    return bool(job_id) and JOB_ID_PATTERN.fullmatch(job_id) is not None
+
+
+def export_path(job_id, fmt, export_dir=EXPORT_DIR):
+    """Return the path of an export file."""
+    return os.path.join(export_dir, f'{job_id}.{fmt}')
+
+
+def status_path(job_id, export_dir=EXPORT_DIR):
+    """Return the path of an export's status file."""
+    return os.path.join(export_dir, f'{job_id}.json')
+
+
+def write_status(job_id, status, export_dir=EXPORT_DIR):
+    """Save an export's status, replacing the file so readers never see it half written."""
+    from mdrm_data import write_atomic
+
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump(status, f)
+    write_atomic(status_path(job_id, export_dir), write)
+
+
+def read_status(job_id, export_dir=EXPORT_DIR):
+    """Return an export's status, or None for unknown jobs."""
+    if not is_job_id(job_id):
+        return None
+    try:
+        with open(status_path(job_id, export_dir)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def prune_exports(export_dir=EXPORT_DIR, max_age=EXPORT_MAX_AGE):
+    """Delete exports and status files older than max_age seconds."""
+    cutoff = time.time() - max_age
+    for entry in os.scandir(export_dir):
+        if is_job_id(entry.name.split('.')[0]) and entry.stat().st_mtime < cutoff:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def write_chunks(df, rows, path, fmt, on_chunk=None, chunk_rows=CHUNK_ROWS):
+    """Write the given rows of a DataFrame to CSV or Parquet, one chunk at a time.
+
+    on_chunk(written) is called after each chunk. The file is written under a
+    temporary name and renamed when complete.
+    """
+    part_path = path + '.part'
+    writer = None
+    # An empty result still gets a file with the header (schema)
+    starts = range(0, max(len(rows), 1), chunk_rows)
+    try:
+        if fmt == 'csv':
+            writer = open(part_path, 'w', newline='')
+        for start in starts:
+            chunk = df.iloc[rows[start:start + chunk_rows]]
+            if fmt == 'csv':
+                chunk.to_csv(writer, header=start == 0, index=False)
+            else:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(chunk, schema=writer.schema if writer else None,
+                                             preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(part_path, table.schema)
+                writer.write_table(table)
+            if on_chunk:
+                on_chunk(min(start + chunk_rows, len(rows)))
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(part_path, path)
+
+
+class ExportQueue:
+    """Runs export jobs on a thread pool, apart from the threads serving requests."""
+
+    def __init__(self, export_dir=EXPORT_DIR, workers=EXPORT_WORKERS):
+        self.export_dir = export_dir
+        # Threads are only started by the first submit, so a queue created
+        # before gunicorn forks is safe to use in the workers
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mdrm-export')
+
+    def submit(self, df, find_rows, fmt):
+        """Queue an export of the rows find_rows() returns (run on the pool) and return its job id."""
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {fmt}")
+        os.makedirs(self.export_dir, exist_ok=True)
+        prune_exports(self.export_dir)
+        job_id = uuid.uuid4().hex
+        status = {'state': 'queued', 'format': fmt, 'rows': None, 'written': 0,
+                  'created': time.time(), 'finished': None, 'error': None}
+        write_status(job_id, status, self.export_dir)
+        self.pool.submit(self.run, job_id, status, df, find_rows)
+        return job_id
+
+    def run(self, job_id, status, df, find_rows):
+        """Find the rows of a job and write them, recording progress as it goes."""
+        def progress(written):
+            status['written'] = written
+            write_status(job_id, status, self.export_dir)
+
+        try:
+            rows = find_rows()
+            status.update(state='running', rows=len(rows))
+            write_status(job_id, status, self.export_dir)
+            write_chunks(df, rows, export_path(job_id, status['format'], self.export_dir),
+                         status['format'], progress)
+            status['state'] = 'done'
+        except Exception as e:
+            print(f"Export {job_id} failed: {e}")
+            status.update(state='failed', error=str(e))
+        status['finished'] = time.time()
+        write_status(job_id, status, self.export_dir)
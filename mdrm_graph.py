@@ -0,0 +1,109 @@
+"""
+MDRM Relationship Graph
+
+This module precomputes the bipartite graphs behind cross-series questions:
+Mnemonics against the Item Codes they use, and Reporting Forms against the
+Item Codes they contain. Each graph is a 0/1 sparse incidence matrix (and its
+transpose), so "all series containing item code 2170" is one row of the
+transpose, and "which forms share the most items with FR Y-9C" is one sparse
+matrix-vector product that yields the overlap and Jaccard similarity with
+every other form at once, followed by a top-k selection.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Graph kinds and the column whose values are linked to Item Codes
+SERIES_COLUMNS = {'mnemonic': 'Mnemonic', 'form': 'Reporting Form'}
+
+
+class SeriesGraph:
+    """0/1 incidence matrix between the series of one kind (rows) and Item Codes (columns)."""
+
+    def __init__(self, kind, series, series_codes, items, item_codes):
+        self.kind = kind
+        self.column = SERIES_COLUMNS[kind]
+        self.series = series
+        self.items = items
+        # Item Codes are looked up case-insensitively, like the search filters
+        self.item_keys = pd.Index(items.str.lower())
+        keep = (series_codes >= 0) & (item_codes >= 0)
+        matrix = sparse.csr_matrix(
+            (np.ones(int(keep.sum()), dtype=np.int32), (series_codes[keep], item_codes[keep])),
+            shape=(len(series), len(items)))
+        # Repeated (series, item) rows were summed; only membership matters
+        matrix.data[:] = 1
+        self.matrix = matrix
+        self.by_item = matrix.T.tocsr()
+        self.sizes = np.diff(matrix.indptr)
+
+    def position(self, name):
+        """Return the row of a series, raising KeyError for unknown names."""
+        position = self.series.get_indexer([name])[0]
+        if position < 0:
+            raise KeyError(name)
+        return position
+
+    def __contains__(self, name):
+        return self.series.get_indexer([name])[0] >= 0
+
+    def with_item(self, item_code):
+        """Return the series (sorted) that use an Item Code, ignoring case."""
+        columns = self.item_keys.get_indexer_for([str(item_code).lower()])
+        rows = [self.by_item.indices[self.by_item.indptr[c]:self.by_item.indptr[c + 1]] for c in columns if c >= 0]
+        if not rows:
+            return self.series[:0]
+        # Codes differing only in case may be used by different series
+        return self.series[np.unique(np.concatenate(rows))]
+
+    def similarities(self, name):
+        """Return the shared item counts and Jaccard similarities of every series with one series."""
+        row = self.position(name)
+        shared = (self.matrix @ self.matrix[row].T).toarray().ravel()
+        union = self.sizes + self.sizes[row] - shared
+        jaccard = np.divide(shared, union, out=np.zeros(len(shared)), where=union > 0)
+        return shared, jaccard
+
+    def neighbors(self, name, k=10, by='shared'):
+        """Return the k series most similar to one series, ranked by 'shared' items or 'jaccard'."""
+        shared, jaccard = self.similarities(name)
+        shared[self.position(name)] = 0
+        # Series sharing no items are never neighbors
+        candidates = np.flatnonzero(shared)
+        primary, secondary = (shared, jaccard) if by == 'shared' else (jaccard, shared)
+        order = candidates[np.lexsort((-secondary[candidates], -primary[candidates]))][:k]
+        return self.table(self.series[order], shared[order], self.sizes[order], jaccard[order])
+
+    def table(self, names, shared, sizes, jaccard):
+        """Format neighbor results as a DataFrame."""
+        return pd.DataFrame({
+            self.column: names,
+            'shared_items': shared,
+            'items': sizes,
+            'jaccard': jaccard,
+        })
+
+
+class RelationshipGraph:
+    """Mnemonic x Item Code and Reporting Form x Item Code graphs over one release."""
+
+    def __init__(self, df):
+        item_codes, items = pd.factorize(df['Item Code'], sort=True)
+        self.items = pd.Index(items.astype(str), name='Item Code')
+        self.graphs = {}
+        for kind, column in SERIES_COLUMNS.items():
+            series_codes, series = pd.factorize(df[column], sort=True)
+            self.graphs[kind] = SeriesGraph(kind, pd.Index(series.astype(str), name=column),
+                                            series_codes, self.items, item_codes)
+
+    def graph_for(self, name, kind=None):
+        """Return the graph holding a Mnemonic or Reporting Form (looked up in both unless kind is given)."""
+        for graph in ([self.graphs[kind]] if kind else self.graphs.values()):
+            if name in graph:
+                return graph
+        raise KeyError(name)
+
+    def series_with_item(self, item_code):
+        """Return the Mnemonics and the Reporting Forms that use an Item Code."""
+        return {kind: graph.with_item(item_code) for kind, graph in self.graphs.items()}
@@ -0,0 +1,149 @@
+"""
+MDRM Filter Index
+
+This module builds an inverted index over the MDRM data once at load time so
+that explorer searches only touch the row ids that match, instead of copying
+and masking the full DataFrame on every request.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Columns filtered by exact value in the explorer
+CATEGORICAL_COLUMNS = ['Mnemonic', 'ItemType', 'Reporting Form', 'Confidentiality']
+
+# Longest n-gram stored for Item Code substring search
+NGRAM_SIZE = 3
+
+
+def build_postings(codes, n_values):
+    """Group row ids by category code into sorted row-id arrays (one per value)."""
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(n_values + 1))
+    return [order[bounds[i]:bounds[i + 1]] for i in range(n_values)]
+
+
+class MDRMIndex:
+    """Read-only index of row ids by column value and Item Code substring."""
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        self.all_rows = np.arange(self.n_rows)
+        self.codes = {}
+        self.categories = {}
+        self.postings = {}
+        for column in CATEGORICAL_COLUMNS + ['Item Code']:
+            codes, uniques = pd.factorize(df[column], sort=True)
+            self.codes[column] = codes
+            self.categories[column] = pd.Index(np.asarray(uniques, dtype=object))
+            self.postings[column] = build_postings(codes, len(uniques))
+
+        # Rows per Item Code value, used to estimate the cost of a substring match
+        self.item_code_sizes = np.array([len(p) for p in self.postings['Item Code']])
+
+        # n-grams (length 1..NGRAM_SIZE) of the lowercased Item Code values
+        grams = {}
+        for code_id, value in enumerate(self.categories['Item Code']):
+            value = str(value).lower()
+            seen = set()
+            for size in range(1, NGRAM_SIZE + 1):
+                for start in range(len(value) - size + 1):
+                    seen.add(value[start:start + size])
+            for gram in seen:
+                grams.setdefault(gram, []).append(code_id)
+        self.item_code_lower = np.array([str(v).lower() for v in self.categories['Item Code']], dtype=object)
+        self.ngrams = {gram: np.array(ids) for gram, ids in grams.items()}
+
+        # MDRM identifier (Mnemonic + Item Code) -> row ids ordered by Start Date,
+        # stored as one sorted array plus per-identifier bounds
+        id_codes, id_values = pd.factorize(df['Mnemonic'].astype(str) + df['Item Code'].astype(str))
+        start_dates = df['Start Date'].to_numpy().astype('int64')
+        self.id_order = np.lexsort((start_dates, id_codes))
+        self.id_bounds = np.searchsorted(id_codes[self.id_order], np.arange(len(id_values) + 1))
+        self.ids = pd.Index(np.asarray(id_values, dtype=object))
+        self.ids.get_indexer(self.ids[:1])  # build the hash table now, not on first lookup
+
+    def value_code(self, column, value):
+        """Return the category code of a value, or -1 if it does not occur."""
+        position = self.categories[column].get_indexer([value])[0]
+        return int(position)
+
+    def lookup(self, mdrm_id):
+        """Return the row ids of every version of an MDRM identifier, oldest first."""
+        return self.lookup_many([mdrm_id])[0]
+
+    def lookup_many(self, mdrm_ids):
+        """Return a list of row-id arrays (one per identifier, empty if unknown)."""
+        positions = self.ids.get_indexer([str(i).upper() for i in mdrm_ids])
+        return [self.id_order[self.id_bounds[p]:self.id_bounds[p + 1]] if p >= 0 else self.id_order[:0]
+                for p in positions]
+
+    def value_counts(self, column, rows=None):
+        """Count rows per value of a column, optionally only over the given row ids."""
+        codes = self.codes[column] if rows is None else self.codes[column][rows]
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.categories[column]))
+        counts = pd.Series(counts, index=self.categories[column], name='count')
+        return counts[counts > 0].sort_values(ascending=False, kind='stable')
+
+    def match_item_codes(self, text):
+        """Return the ids of Item Code values containing text (case-insensitive)."""
+        text = text.lower()
+        if len(text) <= NGRAM_SIZE:
+            return self.ngrams.get(text, np.array([], dtype=int))
+
+        candidates = None
+        for start in range(len(text) - NGRAM_SIZE + 1):
+            ids = self.ngrams.get(text[start:start + NGRAM_SIZE])
+            if ids is None:
+                return np.array([], dtype=int)
+            candidates = ids if candidates is None else np.intersect1d(candidates, ids, assume_unique=True)
+        # n-gram hits are only candidates, so confirm the full substring
+        return np.array([i for i in candidates if text in self.item_code_lower[i]], dtype=int)
+
+    def search(self, mnemonic=None, item_code=None, item_type=None, reporting_form=None, confidentiality=None,
+               stats=None):
+        """Return the sorted row ids matching every given filter.
+
+        When a stats dict is given, its 'scanned' entry is increased by the
+        number of rows examined.
+        """
+        # Each filter is (estimated row count, posting list, row predicate)
+        filters = []
+        for column, value in [('Mnemonic', mnemonic), ('ItemType', item_type),
+                              ('Reporting Form', reporting_form), ('Confidentiality', confidentiality)]:
+            if not value:
+                continue
+            code = self.value_code(column, value)
+            if code < 0:
+                return np.array([], dtype=int)
+            posting = self.postings[column][code]
+            filters.append((len(posting), lambda posting=posting: posting,
+                            lambda rows, column=column, code=code: self.codes[column][rows] == code))
+
+        if item_code:
+            code_ids = self.match_item_codes(item_code)
+            if len(code_ids) == 0:
+                return np.array([], dtype=int)
+            # One extra slot so rows with a missing Item Code (code -1) never match
+            hit = np.zeros(len(self.categories['Item Code']) + 1, dtype=bool)
+            hit[code_ids] = True
+            item_codes = self.codes['Item Code']
+            filters.append((int(self.item_code_sizes[code_ids].sum()),
+                            lambda: np.sort(np.concatenate([self.postings['Item Code'][i] for i in code_ids])),
+                            lambda rows: hit[item_codes[rows]]))
+
+        if not filters:
+            return self.all_rows
+
+        # Start from the most selective filter and probe the rest only on its rows
+        filters.sort(key=lambda f: f[0])
+        rows = filters[0][1]()
+        scanned = len(rows)
+        for _, _, predicate in filters[1:]:
+            if len(rows) == 0:
+                break
+            scanned += len(rows)
+            rows = rows[predicate(rows)]
+        if stats is not None:
+            stats['scanned'] = stats.get('scanned', 0) + scanned
+        return rows
@@ -0,0 +1,177 @@
+"""
+MDRM Explorer Metrics
+
+This module records how long each explorer callback and each stage inside it
+(filtering, value counts, figure building, serialization) takes, how many rows
+searches scan and return, and how large the responses are, and renders them in
+the Prometheus text format for the /metrics endpoint. Values are kept per
+process, so under gunicorn each worker reports its own.
+
+An opt-in sampling profiler (MDRM_PROFILE_SLOW_MS) samples the stacks of
+requests in flight and writes those slower than the threshold as collapsed
+stacks, which flamegraph.pl and speedscope read directly.
+"""
+
+import collections
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BYTES_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7)
+
+# Exported metrics: name -> (type, help text, histogram buckets)
+METRICS = {
+    'mdrm_request_seconds': ('histogram', "Dash callback request latency, including serialization", SECONDS_BUCKETS),
+    'mdrm_stage_seconds': ('histogram', "Time spent in each stage of a callback", SECONDS_BUCKETS),
+    'mdrm_response_bytes': ('histogram', "Dash callback response size", BYTES_BUCKETS),
+    'mdrm_rows_scanned_total': ('counter', "Rows examined by searches and table filters", None),
+    'mdrm_rows_returned_total': ('counter', "Rows returned by searches and lookups", None),
+}
+
+# Requests slower than this many milliseconds have their stacks dumped (0 disables profiling)
+PROFILE_SLOW_MS = float(os.environ.get('MDRM_PROFILE_SLOW_MS', '0'))
+
+# Milliseconds between stack samples while profiling
+PROFILE_INTERVAL_MS = float(os.environ.get('MDRM_PROFILE_INTERVAL_MS', '5'))
+
+# Directory the collapsed stacks are written to
+PROFILE_DIR = os.environ.get('MDRM_PROFILE_DIR', 'mdrm_profiles')
+
+
+def format_labels(labels):
+    """Format label pairs as a Prometheus label set."""
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in labels)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + '}'
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms keyed by metric name and labels."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def observe(self, name, value, **labels):
+        """Add an observation to a histogram."""
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                # Cumulative bucket counts, then the sum and count
+                entry = self.values[key] = [0] * len(buckets) + [0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    entry[i] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def inc(self, name, amount=1, **labels):
+        """Increase a counter."""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        with self.lock:
+            values = {key: list(v) if isinstance(v, list) else v for key, v in self.values.items()}
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            keys = sorted(key for key in values if key[0] == name)
+            if not keys:
+                continue
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for key in keys:
+                labels, value = key[1], values[key]
+                if kind == 'counter':
+                    lines.append(f'{name}{format_labels(labels)} {value}')
+                    continue
+                for bound, count in zip(buckets, value):
+                    lines.append(f'{name}_bucket{format_labels(labels + (("le", f"{bound:g}"),))} {count}')
+                lines.append(f'{name}_bucket{format_labels(labels + (("le", "+Inf"),))} {value[-1]}')
+                lines.append(f'{name}_sum{format_labels(labels)} {value[-2]}')
+                lines.append(f'{name}_count{format_labels(labels)} {value[-1]}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+
+@contextmanager
+def stage(callback, name):
+    """Time a block as one stage of a callback."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.observe('mdrm_stage_seconds', time.perf_counter() - started, callback=callback, stage=name)
+
+
+def collapse_stack(frame):
+    """Return a frame's stack as one collapsed-stack line key (outermost frame first)."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class SlowRequestProfiler(threading.Thread):
+    """Sample the stacks of requests in flight and dump slow ones as collapsed stacks."""
+
+    def __init__(self, threshold_ms=PROFILE_SLOW_MS, interval_ms=PROFILE_INTERVAL_MS, output_dir=PROFILE_DIR):
+        super().__init__(name='mdrm-profiler', daemon=True)
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.output_dir = output_dir
+        self.lock = threading.Lock()
+        # Request thread id -> sampled stack counts
+        self.active = {}
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                if not self.active:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, stacks in self.active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[collapse_stack(frame)] += 1
+
+    def begin(self):
+        """Start sampling the calling thread's request."""
+        with self.lock:
+            self.active[threading.get_ident()] = collections.Counter()
+
+    def end(self, name, elapsed):
+        """Stop sampling the calling thread and dump its stacks if the request was slow."""
+        with self.lock:
+            stacks = self.active.pop(threading.get_ident(), None)
+        if not stacks or elapsed < self.threshold:
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-'
+                                             f'{threading.get_ident()}-{name}-{elapsed * 1000:.0f}ms.folded')
+        with open(path, 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        return path
+
+
+def start_profiler():
+    """Start the slow-request profiler if MDRM_PROFILE_SLOW_MS is set, and return it."""
+    if PROFILE_SLOW_MS <= 0:
+        return None
+    profiler = SlowRequestProfiler()
+    profiler.start()
+    return profiler
@@ -0,0 +1,231 @@
+"""
+MDRM Full-Text Search
+
+This module finds the MDRM rows matching free-text queries such as "total
+assets" or "allowance for loan losses" and ranks them with BM25 over Item
+Name, Description and SeriesGlossary. A row matches when every query term
+other than stopwords appears in its text or its series glossary. The
+inverted index is built in row chunks at startup and saved next to the
+columnar cache, so later starts just load the arrays.
+"""
+
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from mdrm_data import write_atomic
+
+TOKEN_PATTERN = r'[a-z0-9]+'
+
+# Bump when the tokenizer, weights or index layout change, so saved indexes are rebuilt
+SEARCH_VERSION = 2
+
+# Query words that don't have to appear for a row to match
+STOPWORDS = frozenset([
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is', 'of',
+    'on', 'or', 'other', 'than', 'that', 'the', 'to', 'with',
+])
+
+# Item Name matches count three times as much as Description matches
+FIELD_WEIGHTS = {'Item Name': 3.0, 'Description': 1.0}
+
+# Glossaries are shared by every row of a mnemonic, so they only nudge the ranking
+GLOSSARY_WEIGHT = 0.3
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Rows tokenized per step while building
+BUILD_CHUNK_ROWS = 5000
+
+SNIPPET_CHARS = 160
+
+
+def tokenize(text):
+    """Split text into lowercase alphanumeric tokens."""
+    return re.findall(TOKEN_PATTERN, str(text).lower())
+
+
+class BM25Index:
+    """BM25 postings for a fixed set of documents, stored as flat arrays."""
+
+    def __init__(self, vocabulary, offsets, docs, tfs, doc_lengths):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.docs = docs
+        self.tfs = tfs
+        self.n_docs = len(doc_lengths)
+        avg_length = doc_lengths.mean() if self.n_docs else 0.0
+        # Per-document length normalization, precomputed once
+        self.norms = (K1 * (1 - B + B * doc_lengths / max(avg_length, 1e-9))).astype(np.float32)
+        self.doc_lengths = doc_lengths
+
+    @classmethod
+    def build(cls, fields, n_docs, vocabulary=None):
+        """Build from (series, weight) pairs whose index holds document ids 0..n_docs-1."""
+        vocabulary = {} if vocabulary is None else vocabulary
+        keys = []
+        weights = []
+        doc_lengths = np.zeros(n_docs)
+        for series, weight in fields:
+            # Tokenize in chunks so the exploded token lists stay small
+            for start in range(0, len(series), BUILD_CHUNK_ROWS):
+                tokens = series.iloc[start:start + BUILD_CHUNK_ROWS].fillna('').str.lower().str.findall(TOKEN_PATTERN)
+                doc_lengths[tokens.index] += tokens.str.len().to_numpy() * weight
+                tokens = tokens.explode().dropna()
+                if tokens.empty:
+                    continue
+                codes, uniques = pd.factorize(tokens)
+                term_ids = np.array([vocabulary.setdefault(t, len(vocabulary)) for t in uniques])
+                keys.append(term_ids[codes].astype(np.int64) * n_docs + tokens.index.to_numpy())
+                weights.append(np.full(len(codes), weight))
+
+        # Sum the weighted term frequency of each (term, document) pair
+        if keys:
+            pairs, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+            tfs = np.bincount(inverse, weights=np.concatenate(weights)).astype(np.float32)
+        else:
+            pairs, tfs = np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+        offsets = np.searchsorted(pairs // max(n_docs, 1), np.arange(len(vocabulary) + 1))
+        return cls(vocabulary, offsets, (pairs % max(n_docs, 1)).astype(np.int32), tfs, doc_lengths)
+
+    def postings(self, term):
+        """Return the ids of the documents containing a term."""
+        term_id = self.vocabulary.get(term)
+        if term_id is None:
+            return self.docs[:0]
+        return self.docs[self.offsets[term_id]:self.offsets[term_id + 1]]
+
+    def score(self, terms):
+        """Return a dense array of BM25 scores for a list of query terms."""
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for term in set(terms):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs, tfs = self.docs[start:end], self.tfs[start:end]
+            idf = np.log(1 + (self.n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * tfs * (K1 + 1) / (tfs + self.norms[docs])
+        return scores
+
+    def arrays(self, prefix):
+        """Return the index arrays for saving, with names prefixed."""
+        terms = np.empty(len(self.vocabulary), dtype=object)
+        for term, term_id in self.vocabulary.items():
+            terms[term_id] = term
+        return {prefix + 'terms': terms.astype(str), prefix + 'offsets': self.offsets,
+                prefix + 'docs': self.docs, prefix + 'tfs': self.tfs,
+                prefix + 'doc_lengths': self.doc_lengths}
+
+    @classmethod
+    def from_arrays(cls, data, prefix):
+        """Rebuild an index saved with arrays()."""
+        vocabulary = {term: i for i, term in enumerate(data[prefix + 'terms'].tolist())}
+        return cls(vocabulary, data[prefix + 'offsets'], data[prefix + 'docs'],
+                   data[prefix + 'tfs'], data[prefix + 'doc_lengths'])
+
+
+class SearchIndex:
+    """Full-text search over MDRM rows, with glossaries indexed once per mnemonic."""
+
+    def __init__(self, rows, glossaries, glossary_codes):
+        self.rows = rows
+        self.glossaries = glossaries
+        self.glossary_codes = glossary_codes
+
+    @classmethod
+    def build(cls, df):
+        """Build the row and glossary indexes from the MDRM DataFrame."""
+        frame = df.reset_index(drop=True)
+        rows = BM25Index.build([(frame[c].astype(object), w) for c, w in FIELD_WEIGHTS.items()], len(frame))
+        glossary_codes, glossary_texts = pd.factorize(frame['SeriesGlossary'].astype(object))
+        glossaries = BM25Index.build([(pd.Series(glossary_texts, dtype=object), 1.0)], len(glossary_texts))
+        return cls(rows, glossaries, glossary_codes)
+
+    def save(self, path):
+        """Save the index arrays to an .npz file (through a unique temporary file)."""
+        def write(tmp_path):
+            # Through a file object, since np.savez would add .npz to the temporary name
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, glossary_codes=self.glossary_codes,
+                         **self.rows.arrays('rows_'), **self.glossaries.arrays('glossary_'))
+        write_atomic(path, write)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index written by save()."""
+        with np.load(path) as data:
+            return cls(BM25Index.from_arrays(data, 'rows_'), BM25Index.from_arrays(data, 'glossary_'),
+                       data['glossary_codes'])
+
+    def matches(self, terms):
+        """Return a row mask of the rows containing every term, in their text or their glossary."""
+        matched = np.ones(self.rows.n_docs, dtype=bool)
+        for term in terms:
+            found = np.zeros(self.rows.n_docs, dtype=bool)
+            found[self.rows.postings(term)] = True
+            # Trailing False for rows without a glossary (code -1)
+            in_glossary = np.zeros(self.glossaries.n_docs + 1, dtype=bool)
+            in_glossary[self.glossaries.postings(term)] = True
+            matched &= found | in_glossary[self.glossary_codes]
+        return matched
+
+    def search(self, query, rows=None):
+        """Return (row ids, scores) matching the query, best first, optionally within rows."""
+        terms = sorted(set(tokenize(query)))
+        # Stopwords only count when the query has nothing else
+        terms = [t for t in terms if t not in STOPWORDS] or terms
+        if not terms:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+        matched = self.matches(terms)
+        candidates = np.flatnonzero(matched) if rows is None else rows[matched[rows]]
+        # BM25 only orders the matching rows
+        scores = self.rows.score(terms)
+        if self.glossaries.n_docs:
+            glossary_scores = np.append(self.glossaries.score(terms), 0)
+            scores += GLOSSARY_WEIGHT * glossary_scores[self.glossary_codes]
+        # Highest score first; ties keep row order
+        order = np.argsort(-scores[candidates], kind='stable')
+        return candidates[order], scores[candidates[order]]
+
+
+def load_search_index(df, cache_dir=None):
+    """Load the search index for this dataset version, building and saving it if needed."""
+    version = df.attrs.get('mdrm_version')
+    path = os.path.join(cache_dir, f'search-v{SEARCH_VERSION}-{version[:16]}.npz') if cache_dir and version else None
+    if path and os.path.exists(path):
+        return SearchIndex.load(path)
+
+    print("Building full-text search index...")
+    index = SearchIndex.build(df)
+    if path:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            index.save(path)
+            # Drop indexes of previous dataset versions
+            for name in os.listdir(cache_dir):
+                if name.startswith('search-') and name.endswith('.npz') and name != os.path.basename(path):
+                    os.remove(os.path.join(cache_dir, name))
+        except OSError as e:
+            print(f"Could not write search index to '{cache_dir}': {e}")
+    return index
+
+
+def snippet(text, query, width=SNIPPET_CHARS):
+    """Return a Markdown snippet of text around the first query term, with terms in bold."""
+    if not isinstance(text, str) or not text:
+        return ''
+    terms = sorted(set(tokenize(query)), key=len, reverse=True)
+    pattern = re.compile(r'\b(' + '|'.join(map(re.escape, terms)) + r')\b', re.IGNORECASE) if terms else None
+    match = pattern.search(text) if pattern else None
+    start = max(0, match.start() - width // 3) if match else 0
+    excerpt = text[start:start + width]
+    # Escape Markdown so only the highlights are formatted
+    excerpt = re.sub(r'([\\`*_\[\]#|<>])', r'\\\1', ' '.join(excerpt.split()))
+    if pattern:
+        excerpt = pattern.sub(r'**\1**', excerpt)
+    return ('...' if start > 0 else '') + excerpt + ('...' if start + width < len(text) else '')
@@ -0,0 +1,185 @@
+"""
+MDRM Streaming Analysis
+
+This module computes the statistics behind mdrm_analysis's report without
+loading the whole CSV, for inputs (such as concatenated historical releases)
+too large to hold in memory. The CSV is read in blocks that end on record
+boundaries, each block is parsed into a small mergeable accumulator (value
+counts, date bounds, distinct Item Code/Mnemonic pairs and Item
+Code/Mnemonic/Item Name triples), and the accumulators are merged in file
+order. Memory therefore grows with the number of distinct values, not with
+the number of rows, and blocks can be parsed by several processes at once.
+"""
+
+import io
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from mdrm_analysis import AnalysisResults, consistency_table
+from mdrm_asof import OPEN_END_DATE
+from mdrm_data import CSV_PATH, parse_dates
+
+# Bytes of CSV parsed per block
+BLOCK_BYTES = 32 * 1024 * 1024
+
+# AnalysisResults value-count attributes and the column each one counts
+COUNT_COLUMNS = {
+    'mnemonic_counts': 'Mnemonic',
+    'item_type_counts': 'ItemType',
+    'conf_counts': 'Confidentiality',
+    'item_code_counts': 'Item Code',
+    'form_counts': 'Reporting Form',
+}
+
+# Columns parsed from each block (the long text columns are skipped)
+BLOCK_COLUMNS = list(COUNT_COLUMNS.values()) + ['Start Date', 'End Date', 'Item Name']
+
+# Dates already parsed by this process, shared by every block it parses
+known_dates = {}
+
+
+def parse_block_dates(values):
+    """Parse date strings, reusing the dates parsed from earlier blocks."""
+    codes, uniques = pd.factorize(values)
+    new = [u for u in uniques if u not in known_dates]
+    if new:
+        known_dates.update(zip(new, parse_dates(pd.Series(new, dtype=object)).to_numpy()))
+    lookup = np.array([known_dates[u] for u in uniques] + [np.datetime64('NaT', 's')], dtype='datetime64[s]')
+    return pd.Series(lookup[codes], index=values.index, name=values.name)
+
+
+def read_blocks(csv_path, block_bytes=BLOCK_BYTES):
+    """Yield (header, block) pairs from an MDRM CSV, each block ending on a record boundary."""
+    with open(csv_path, 'rb') as f:
+        f.readline()  # the "PUBLIC" line
+        header = f.readline()
+        carry = b''
+        while True:
+            data = f.read(block_bytes)
+            if not data:
+                break
+            data = carry + data
+            # A newline ends a record only outside quotes, i.e. after an even
+            # number of quote characters (escaped quotes come in pairs)
+            end = data.rfind(b'\n')
+            while end >= 0 and data.count(b'"', 0, end) % 2:
+                end = data.rfind(b'\n', 0, end)
+            if end < 0:
+                carry = data
+                continue
+            carry = data[end + 1:]
+            yield header, data[:end + 1]
+        if carry.strip():
+            yield header, carry
+
+
+class SummaryAccumulator:
+    """Mergeable statistics over a run of MDRM rows."""
+
+    def __init__(self):
+        self.n_records = 0
+        self.counts = {attribute: pd.Series(dtype='int64') for attribute in COUNT_COLUMNS}
+        self.min_date = pd.NaT
+        self.max_date = pd.NaT
+        self.last_end_date = pd.NaT
+        self.n_active = 0
+        self.mnemonic_pairs = pd.DataFrame(columns=['Item Code', 'Mnemonic'], dtype=object)
+        self.series_names = pd.DataFrame(columns=['Item Code', 'Mnemonic', 'Item Name'], dtype=object)
+
+    @classmethod
+    def from_block(cls, header, block):
+        """Parse one CSV block, given the header line separately, into an accumulator."""
+        chunk = pd.read_csv(io.BytesIO(header + block), encoding='utf-8', usecols=BLOCK_COLUMNS,
+                            dtype={'Mnemonic': str, 'Item Code': str})
+        acc = cls()
+        acc.n_records = len(chunk)
+        for attribute, column in COUNT_COLUMNS.items():
+            acc.counts[attribute] = chunk[column].value_counts(sort=False)
+        start_dates = parse_block_dates(chunk['Start Date'])
+        end_dates = parse_block_dates(chunk['End Date'])
+        acc.min_date = start_dates.min()
+        acc.max_date = end_dates.max()
+        acc.last_end_date = end_dates[end_dates != OPEN_END_DATE].max()
+        # Active items have an end date of 9999-12-31
+        acc.n_active = int((end_dates.dt.year == 9999).sum())
+        acc.mnemonic_pairs = chunk[['Item Code', 'Mnemonic']].dropna().astype(str).drop_duplicates()
+        acc.series_names = chunk[['Item Code', 'Mnemonic', 'Item Name']].dropna().astype(str).drop_duplicates()
+        return acc
+
+    def merge(self, other):
+        """Add the statistics of rows that follow these ones in the file."""
+        self.n_records += other.n_records
+        for attribute in COUNT_COLUMNS:
+            # Align without sorting so values stay in order of first appearance
+            ours, theirs = self.counts[attribute], other.counts[attribute]
+            index = ours.index.union(theirs.index, sort=False)
+            self.counts[attribute] = (ours.reindex(index, fill_value=0)
+                                      + theirs.reindex(index, fill_value=0))
+        self.min_date = min_date(self.min_date, other.min_date)
+        self.max_date = max_date(self.max_date, other.max_date)
+        self.last_end_date = max_date(self.last_end_date, other.last_end_date)
+        self.n_active += other.n_active
+        # Concatenating in file order keeps each pair's first appearance first
+        self.mnemonic_pairs = pd.concat([self.mnemonic_pairs, other.mnemonic_pairs]).drop_duplicates()
+        self.series_names = pd.concat([self.series_names, other.series_names]).drop_duplicates()
+        return self
+
+    def results(self):
+        """Return an AnalysisResults holding the merged statistics."""
+        results = AnalysisResults(None)
+        results.n_records = self.n_records
+        for attribute, column in COUNT_COLUMNS.items():
+            # Equal counts stay in order of first appearance
+            counts = self.counts[attribute].astype('int64').sort_values(ascending=False, kind='stable')
+            counts.index.name = column
+            setattr(results, attribute, counts.rename('count'))
+        results.n_mnemonics = len(results.mnemonic_counts)
+        results.n_item_codes = len(results.item_code_counts)
+        results.n_reporting_forms = len(results.form_counts)
+        results.min_date = self.min_date
+        results.max_date = self.max_date
+        results.last_end_date = self.last_end_date
+        results.n_active = self.n_active
+        results.item_cross_mnemonic = (self.mnemonic_pairs.groupby('Item Code')['Mnemonic'].nunique()
+                                       .sort_values(ascending=False))
+        results.item_code_table = consistency_table(self.mnemonic_pairs, self.series_names,
+                                                    results.item_code_counts)
+        return results
+
+
+def min_date(a, b):
+    """Return the earlier of two dates, ignoring missing ones."""
+    return b if pd.isna(a) else a if pd.isna(b) else min(a, b)
+
+
+def max_date(a, b):
+    """Return the later of two dates, ignoring missing ones."""
+    return b if pd.isna(a) else a if pd.isna(b) else max(a, b)
+
+
+def stream_results(csv_paths=None, workers=1, block_bytes=BLOCK_BYTES):
+    """Analyze one or more MDRM CSVs block by block and return an AnalysisResults.
+
+    With workers > 1, blocks are parsed in that many processes while the
+    reader keeps at most two blocks per worker in flight.
+    """
+    csv_paths = csv_paths or [CSV_PATH]
+    total = SummaryAccumulator()
+    blocks = (block for path in csv_paths for block in read_blocks(path, block_bytes))
+    if workers <= 1:
+        for header, block in blocks:
+            total.merge(SummaryAccumulator.from_block(header, block))
+        return total.results()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for header, block in blocks:
+            pending.append(pool.submit(SummaryAccumulator.from_block, header, block))
+            # Merge finished blocks in file order to bound memory
+            while len(pending) >= 2 * workers or (pending and pending[0].done()):
+                total.merge(pending.pop(0).result())
+        for future in pending:
+            total.merge(future.result())
+    return total.results()
@@ -0,0 +1,111 @@
+"""
+MDRM Table Store
+
+This module backs the explorer's results table with server-side paging,
+sorting and filtering. Each displayed column is factorized once into sorted
+codes and display labels, so sorting is an integer argsort, table filters are
+evaluated on the distinct labels only, and a page is rendered straight from
+the labels without touching the DataFrame.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+# Dash filter operators, in the order they must be tried when parsing
+FILTER_OPERATORS = [
+    ('ge', '>='), ('le', '<='), ('lt', '<'), ('gt', '>'), ('ne', '!='), ('eq', '='),
+    ('contains', None), ('datestartswith', None),
+]
+
+FILTER_PART = re.compile(r'^\s*\{(?P<column>[^}]+)\}\s+(?P<operator>\S+)\s+(?P<value>.*?)\s*$')
+
+
+def parse_filter_query(filter_query):
+    """Split a DataTable filter query into (column, operator, value, case_sensitive) tuples."""
+    if not filter_query:
+        return []
+    parts = []
+    for part in filter_query.split(' && '):
+        match = FILTER_PART.match(part)
+        if not match:
+            continue
+        operator = match.group('operator')
+        # Operators may carry an 's' (sensitive) or 'i' (insensitive) prefix
+        case_sensitive = not operator.startswith('i')
+        for name, symbol in FILTER_OPERATORS:
+            forms = (name,) if symbol is None else (name, symbol)
+            if operator in forms or (operator[:1] in 'si' and operator[1:] in forms):
+                break
+        else:
+            continue
+        value = match.group('value')
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'`':
+            value = value[1:-1]
+        parts.append((match.group('column'), name, value, case_sensitive))
+    return parts
+
+
+def match_labels(labels, operator, value, case_sensitive=True):
+    """Evaluate a filter operator against an array of display labels."""
+    labels = pd.Series(labels, dtype=object)
+    if not case_sensitive:
+        labels = labels.str.lower()
+        value = value.lower()
+    if operator == 'contains':
+        return labels.str.contains(value, regex=False).to_numpy()
+    if operator == 'datestartswith':
+        return labels.str.startswith(value).to_numpy()
+    compare = {
+        'eq': labels.__eq__, 'ne': labels.__ne__, 'lt': labels.__lt__,
+        'le': labels.__le__, 'gt': labels.__gt__, 'ge': labels.__ge__,
+    }[operator]
+    return compare(value).to_numpy()
+
+
+class TableStore:
+    """Factorized, presorted copy of the columns shown in the results table."""
+
+    def __init__(self, df, columns):
+        self.columns = columns
+        self.codes = {}
+        self.labels = {}
+        for column in columns:
+            codes, uniques = pd.factorize(df[column], sort=True)
+            if pd.api.types.is_datetime64_any_dtype(df[column]):
+                labels = pd.DatetimeIndex(uniques).strftime('%Y-%m-%d')
+            else:
+                labels = pd.Index(uniques).astype(str)
+            # Missing values (code -1) get the last code so they sort after
+            # every value and show as an empty cell
+            codes = np.where(codes < 0, len(uniques), codes)
+            self.codes[column] = codes
+            self.labels[column] = np.append(np.asarray(labels, dtype=object), '')
+
+    def filter(self, rows, filter_query):
+        """Keep the rows matching a DataTable filter query."""
+        for column, operator, value, case_sensitive in parse_filter_query(filter_query):
+            if column not in self.codes or len(rows) == 0:
+                continue
+            # Evaluate on the distinct labels, then map back through the codes
+            hit = match_labels(self.labels[column][:-1], operator, value, case_sensitive)
+            hit = np.append(hit, False)
+            rows = rows[hit[self.codes[column][rows]]]
+        return rows
+
+    def sort(self, rows, sort_by):
+        """Order rows by a DataTable sort_by list (last entry is least significant)."""
+        for sort in reversed(sort_by or []):
+            if sort['column_id'] not in self.codes:
+                continue
+            keys = self.codes[sort['column_id']][rows]
+            if sort['direction'] == 'desc':
+                keys = -keys
+            rows = rows[np.argsort(keys, kind='stable')]
+        return rows
+
+    def records(self, rows):
+        """Render rows as DataTable records of the displayed columns."""
+        data = {column: self.labels[column][self.codes[column][rows]] for column in self.columns}
+        return [dict(zip(self.columns, values)) for values in zip(*data.values())]
@@ -0,0 +1,111 @@
+"""
+MDRM Typeahead
+
+This module builds sorted-array prefix indexes over the values the explorer's
+search boxes complete: Mnemonics, Reporting Forms, Item Codes, full MDRM
+identifiers and Item Names. Each index is one sorted array of lowercased keys,
+so the values starting with a prefix are the contiguous slice found by two
+binary searches, and the top-k completions are picked from that slice by row
+count. Item Names are indexed from the start of every word, so "loans"
+completes "TOTAL LOANS AND LEASES" as well.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+# Completions returned by default
+TOP_K = 10
+
+# Sorts after every character that can follow a prefix
+PREFIX_END = '\U0010ffff'
+
+# Keys are stored as fixed-width strings (which sort and search much faster
+# than Python strings) cut to this length; longer prefixes are checked
+# against the values themselves
+KEY_LENGTH = 32
+
+WORD_START = re.compile(r'\b\w')
+
+
+class PrefixIndex:
+    """Sorted lowercase keys, each pointing to the value (and its row count) it completes.
+
+    With words=True every word of a value is a key, so a prefix matches the
+    start of any word.
+    """
+
+    def __init__(self, values, counts, words=False):
+        values = np.asarray(values, dtype=object)
+        lower = np.array([str(v).lower() for v in values], dtype=object)
+        # Value ids in alphabetical order, so ties between completions are alphabetical
+        order = np.argsort(lower.astype(f'U{KEY_LENGTH}'), kind='stable')
+        self.values = values[order]
+        self.counts = np.asarray(counts)[order]
+        self.lower = lower[order]
+        self.words = words
+        if words:
+            keys, value_ids = word_keys(self.lower)
+            keys = np.array(keys, dtype=f'U{KEY_LENGTH}')
+            key_order = np.argsort(keys, kind='stable')
+            self.keys = keys[key_order]
+            self.value_ids = np.array(value_ids)[key_order]
+        else:
+            self.keys = self.lower.astype(f'U{KEY_LENGTH}')
+            self.value_ids = np.arange(len(order))
+
+    def matches(self, prefix):
+        """Return the ids (ascending) of the values with a key starting with prefix."""
+        prefix = prefix.lower()
+        key = prefix[:KEY_LENGTH]
+        start, end = np.searchsorted(self.keys, [key, key + PREFIX_END])
+        ids = self.value_ids[start:end]
+        if self.words:
+            ids = np.unique(ids)
+        if len(prefix) > KEY_LENGTH:
+            # The keys only hold the start of the prefix; check the rest
+            if self.words:
+                pattern = re.compile(r'\b' + re.escape(prefix))
+                ids = np.array([i for i in ids if pattern.search(self.lower[i])], dtype=ids.dtype)
+            else:
+                ids = np.array([i for i in ids if self.lower[i].startswith(prefix)], dtype=ids.dtype)
+        return ids
+
+    def complete(self, prefix, k=TOP_K):
+        """Return the k completions of prefix with the most rows, as (value, rows) pairs, and the number of matches."""
+        ids = self.matches(prefix)
+        # Most rows first, ties alphabetically (ids are ascending)
+        top = ids[np.argsort(-self.counts[ids], kind='stable')[:k]]
+        return [(self.values[i], int(self.counts[i])) for i in top], len(ids)
+
+
+def word_keys(values):
+    """Return a key for every word start of every (lowercase) value, with the id of its value."""
+    keys = []
+    value_ids = []
+    for value_id, value in enumerate(values):
+        for match in WORD_START.finditer(value):
+            keys.append(value[match.start():match.start() + KEY_LENGTH])
+            value_ids.append(value_id)
+    return keys, value_ids
+
+
+class TypeaheadIndex:
+    """Prefix indexes for every field the explorer completes."""
+
+    def __init__(self, df, index):
+        self.fields = {}
+        for field, column in (('mnemonic', 'Mnemonic'), ('reporting_form', 'Reporting Form'),
+                              ('item_code', 'Item Code')):
+            sizes = np.array([len(p) for p in index.postings[column]])
+            self.fields[field] = PrefixIndex(index.categories[column], sizes)
+        self.fields['mdrm_id'] = PrefixIndex(index.ids, np.diff(index.id_bounds))
+
+        codes, names = pd.factorize(df['Item Name'])
+        counts = np.bincount(codes[codes >= 0], minlength=len(names))
+        self.fields['item_name'] = PrefixIndex(names, counts, words=True)
+
+    def complete(self, field, prefix, k=TOP_K):
+        """Return the top-k completions of prefix for a field and the number of matches."""
+        return self.fields[field].complete(prefix or '', k)
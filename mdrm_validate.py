@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+MDRM Identifier Validation
+
+This module checks batches of MDRM identifiers (Mnemonic + Item Code, such as
+BHCK2170) against the manual: whether each one exists, whether it is active on
+a report date, and whether its Item Type and Confidentiality are the expected
+ones. Identifiers are packed into 8-byte integer keys and joined against a
+prebuilt identifier table with one hash lookup per chunk, so files of millions
+of identifiers stream through at millions of ids per second.
+
+Run it as a script to validate one identifier per line from a file or stdin:
+
+    python mdrm_validate.py ids.txt --date 2024-03-31 --item-type F D -o results.csv
+    cat ids.txt | python mdrm_validate.py - --confidentiality N
+"""
+
+import argparse
+import contextlib
+import datetime
+import itertools
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from mdrm_asof import AsOfIndex
+from mdrm_data import load_mdrm
+
+# MDRM identifiers are 4-character mnemonics plus 4-character item codes
+ID_BYTES = 8
+
+# Input bytes read per chunk
+CHUNK_BYTES = 16 * 1024 * 1024
+
+# Appended to the kept start of an input token too long to be an identifier
+OVERLONG_SUFFIX = b'...'
+
+RESULT_COLUMNS = ['MDRM', 'exists', 'active', 'ItemType', 'Confidentiality', 'valid']
+
+
+def normalize_ids(values):
+    """Return identifiers as an uppercase bytes array."""
+    if isinstance(values, np.ndarray) and values.dtype.kind == 'S':
+        ids = values.copy()
+    else:
+        ids = np.array([str(v).strip().encode() for v in values], dtype=bytes)
+    if ids.dtype.kind != 'S':
+        ids = ids.astype('S1')
+    # Uppercase ASCII letters in place on the raw bytes
+    chars = ids.view(np.uint8)
+    chars[(chars >= ord('a')) & (chars <= ord('z'))] -= 32
+    return ids
+
+
+def id_lengths(ids):
+    """Return the length of each identifier in a bytes array."""
+    if len(ids) == 0:
+        return np.zeros(0, int)
+    return (ids.view(np.uint8).reshape(len(ids), -1) != 0).sum(axis=1)
+
+
+def csv_quote(ids):
+    """Quote the identifiers that contain commas, double quotes or control bytes for a CSV field."""
+    if len(ids) == 0:
+        return ids
+    chars = ids.view(np.uint8).reshape(len(ids), -1)
+    special = ((chars == ord(',')) | (chars == ord('"')) | ((chars > 0) & (chars < 32)) | (chars == 127)).any(axis=1)
+    if not special.any():
+        return ids
+    quoted = ids.astype(object)
+    quoted[special] = [b'"' + v.replace(b'"', b'""') + b'"' for v in quoted[special]]
+    return quoted.astype(bytes)
+
+
+class IdentifierTable:
+    """One entry per MDRM identifier, for vectorized batch validation."""
+
+    def __init__(self, df, as_of_index=None):
+        id_codes, id_values = pd.factorize(df['Mnemonic'].astype(str) + df['Item Code'].astype(str))
+        self.id_codes = id_codes
+        self.ids = np.array([v.encode() for v in id_values], dtype=bytes)
+        self.width = max(ID_BYTES, self.ids.dtype.itemsize)
+        self.keys = pd.Index(self.pack(self.ids))
+        self.keys.get_indexer(self.keys[:1])  # build the hash table now, not on first batch
+
+        # Latest version (by Start Date) of each identifier
+        start_dates = df['Start Date'].to_numpy().astype('int64')
+        order = np.lexsort((start_dates, id_codes))
+        last = np.searchsorted(id_codes[order], np.arange(len(id_values)), side='right') - 1
+        self.latest_rows = order[last]
+
+        self.item_type_codes, self.item_types = pd.factorize(df['ItemType'], sort=True)
+        self.confidentiality_codes, self.confidentiality = pd.factorize(df['Confidentiality'], sort=True)
+        self.as_of_index = as_of_index or AsOfIndex(df)
+        self.date_rows = {}
+
+    def pack(self, ids):
+        """Pack a bytes array of identifiers into hashable keys."""
+        ids = ids.astype(f'S{self.width}')
+        if self.width == ID_BYTES:
+            # ASCII identifiers fit a positive big-endian int64
+            return ids.view('>i8').astype(np.int64)
+        return ids.astype(object)
+
+    def positions(self, ids):
+        """Return the table position of each normalized identifier (-1 if unknown)."""
+        positions = self.keys.get_indexer(self.pack(ids))
+        # Longer inputs were truncated by pack(), so they cannot match
+        positions[id_lengths(ids) > self.width] = -1
+        return positions
+
+    def rows_on(self, date):
+        """Return, per identifier, the row of its version valid on a date (-1 if none)."""
+        date = np.datetime64(pd.Timestamp(date).date(), 's')
+        if date not in self.date_rows:
+            rows = self.as_of_index.valid_rows(date)
+            by_id = np.full(len(self.ids), -1)
+            by_id[self.id_codes[rows]] = rows
+            self.date_rows[date] = by_id
+        return self.date_rows[date]
+
+    def check(self, positions, date=None, item_types=None, confidentiality=None):
+        """Return the validation arrays for table positions.
+
+        Attributes come from the version active on the date (today by default),
+        or from the latest version when none is active. Unknown identifiers get
+        attribute code -1.
+        """
+        exists = positions >= 0
+        positions = np.where(exists, positions, 0)
+        on_date = self.rows_on(date or datetime.date.today())[positions]
+        active = exists & (on_date >= 0)
+        rows = np.where(active, on_date, self.latest_rows[positions])
+        item_type_codes = np.where(exists, self.item_type_codes[rows], -1)
+        confidentiality_codes = np.where(exists, self.confidentiality_codes[rows], -1)
+
+        valid = active.copy()
+        if item_types:
+            accepted = self.item_types.get_indexer(list(item_types))
+            valid &= np.isin(item_type_codes, accepted[accepted >= 0])
+        if confidentiality:
+            accepted = self.confidentiality.get_indexer([confidentiality])
+            valid &= np.isin(confidentiality_codes, accepted[accepted >= 0])
+        return {'exists': exists, 'active': active, 'ItemType': item_type_codes,
+                'Confidentiality': confidentiality_codes, 'valid': valid}
+
+    def validate(self, ids, date=None, item_types=None, confidentiality=None):
+        """Validate identifiers and return one result row per identifier."""
+        ids = normalize_ids(ids)
+        checks = self.check(self.positions(ids), date, item_types, confidentiality)
+        results = pd.DataFrame({'MDRM': np.char.decode(ids, 'utf-8')})
+        for column in RESULT_COLUMNS[1:]:
+            results[column] = checks[column]
+        results['ItemType'] = pd.Categorical.from_codes(checks['ItemType'], self.item_types)
+        results['Confidentiality'] = pd.Categorical.from_codes(checks['Confidentiality'], self.confidentiality)
+        return results
+
+    def result_suffixes(self):
+        """Return the CSV text after the identifier for every combination of results."""
+        suffixes = []
+        for exists, active, item_type, confidentiality, valid in itertools.product(
+                [False, True], [False, True], [''] + list(self.item_types),
+                [''] + list(self.confidentiality), [False, True]):
+            suffixes.append(f',{exists},{active},{item_type},{confidentiality},{valid}'.encode())
+        return np.array(suffixes, dtype=bytes)
+
+    def result_lines(self, ids, checks, suffixes):
+        """Format validation results as CSV lines (without a header)."""
+        # Index the suffix table in itertools.product order
+        combo = checks['exists'].astype(int)
+        combo = combo * 2 + checks['active']
+        combo = combo * (len(self.item_types) + 1) + checks['ItemType'] + 1
+        combo = combo * (len(self.confidentiality) + 1) + checks['Confidentiality'] + 1
+        combo = combo * 2 + checks['valid']
+        lines = np.char.add(csv_quote(ids), suffixes[combo])
+        return b'\n'.join(lines.tolist()) + b'\n'
+
+
+def pack_tokens(tokens, max_width=None):
+    """Return input tokens as a normalized identifier array.
+
+    Tokens longer than max_width can't be identifiers; they are cut to
+    max_width bytes plus OVERLONG_SUFFIX, which keeps them unknown and keeps
+    one garbage line from sizing the whole array.
+    """
+    if max_width is not None and max(map(len, tokens)) > max_width:
+        tokens = [t if len(t) <= max_width else t[:max_width] + OVERLONG_SUFFIX for t in tokens]
+    return normalize_ids(np.array(tokens))
+
+
+def read_id_chunks(source, chunk_bytes=CHUNK_BYTES, max_width=None):
+    """Yield normalized identifier arrays from a binary stream with one identifier per line."""
+    carry = b''
+    while True:
+        data = source.read(chunk_bytes)
+        if not data:
+            break
+        data = carry + data
+        # Keep a partial last line for the next chunk
+        cut = data.rfind(b'\n') + 1
+        carry = data[cut:]
+        tokens = data[:cut].split()
+        if tokens:
+            yield pack_tokens(tokens, max_width)
+    if carry.split():
+        yield pack_tokens(carry.split(), max_width)
+
+
+def validate_stream(table, source, output, date=None, item_types=None, confidentiality=None,
+                    chunk_bytes=CHUNK_BYTES):
+    """Validate identifiers from a binary stream, writing CSV results as each chunk is done.
+
+    Returns the number of identifiers, valid, unknown and inactive ones.
+    """
+    suffixes = table.result_suffixes()
+    output.write((','.join(RESULT_COLUMNS) + '\n').encode())
+    counts = {'ids': 0, 'valid': 0, 'unknown': 0, 'inactive': 0}
+    for ids in read_id_chunks(source, chunk_bytes, table.width):
+        checks = table.check(table.positions(ids), date, item_types, confidentiality)
+        output.write(table.result_lines(ids, checks, suffixes))
+        counts['ids'] += len(ids)
+        counts['valid'] += int(checks['valid'].sum())
+        counts['unknown'] += int((~checks['exists']).sum())
+        counts['inactive'] += int((checks['exists'] & ~checks['active']).sum())
+    return counts
+
+
+def main():
+    """Validate MDRM identifiers from a file or stdin and write a results CSV."""
+    parser = argparse.ArgumentParser(description="Validate MDRM identifiers against the manual")
+    parser.add_argument('input', nargs='?', default='-', help="file with one identifier per line ('-' for stdin)")
+    parser.add_argument('-o', '--output', default='-', help="results CSV to write ('-' for stdout)")
+    parser.add_argument('--date', help="report date the identifiers must be active on (default: today)")
+    parser.add_argument('--item-type', nargs='+', metavar='TYPE', help="accepted Item Types, e.g. F D")
+    parser.add_argument('--confidentiality', choices=['Y', 'N'], help="required Confidentiality")
+    args = parser.parse_args()
+
+    # Keep progress messages off stdout, which may carry the results
+    with contextlib.redirect_stdout(sys.stderr):
+        table = IdentifierTable(load_mdrm())
+
+    started = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        source = sys.stdin.buffer if args.input == '-' else stack.enter_context(open(args.input, 'rb'))
+        output = sys.stdout.buffer if args.output == '-' else stack.enter_context(open(args.output, 'wb'))
+        counts = validate_stream(table, source, output, args.date, args.item_type, args.confidentiality)
+    elapsed = time.perf_counter() - started
+
+    print(f"Validated {counts['ids']} ids in {elapsed:.2f}s ({counts['ids'] / max(elapsed, 1e-9):,.0f} ids/s): "
+          f"{counts['valid']} valid, {counts['unknown']} unknown, {counts['inactive']} not active",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
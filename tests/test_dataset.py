@@ -0,0 +1,201 @@
+"""Tests for the release diff and the reload path in mdrm_dataset."""
+
+import os
+
+import pandas as pd
+import pytest
+
+from mdrm_data import COLUMNS, load_mdrm
+from mdrm_dataset import (LOCK_NAME, DatasetWatcher, MDRMDataset, diff_releases, read_release,
+                          save_change_log, try_lock)
+from mdrm_explorer import TABLE_COLUMNS
+
+OPEN = '9999-12-31 00:00:00'
+
+
+def row(mnemonic, code, start, end=OPEN, name='ITEM', description='Text', glossary=None):
+    return {'Mnemonic': mnemonic, 'Item Code': code, 'Start Date': start, 'End Date': end,
+            'Item Name': name, 'Confidentiality': 'N', 'ItemType': 'F', 'Reporting Form': 'FR Y-9C',
+            'Description': description, 'SeriesGlossary': glossary}
+
+
+def write_release(path, rows):
+    with open(path, 'w', newline='') as f:
+        f.write('PUBLIC\n')
+        pd.DataFrame(rows, columns=COLUMNS).to_csv(f, index=False)
+
+
+def load_release(tmp_path, rows, name='MDRM_CSV.csv'):
+    path = tmp_path / name
+    write_release(path, rows)
+    return load_mdrm(str(path), use_cache=False)
+
+
+OLD_ROWS = [
+    row('RCON', '2170', '2001-01-01 00:00:00', name='TOTAL ASSETS'),
+    row('RCON', '2948', '2001-01-01 00:00:00', name='TOTAL LIABILITIES'),
+    row('BHCK', '2170', '2001-01-01 00:00:00', name='TOTAL ASSETS'),
+    row('BHCK', '3210', '2001-01-01 00:00:00', description=None),
+    row('BHCK', '3300', '2001-01-01 00:00:00', description=None, glossary='Old'),
+]
+
+NEW_ROWS = [
+    # RCON 2170 unchanged
+    OLD_ROWS[0],
+    # RCON 2948 removed, BHCK 2170 ended, BHCK 3210 gains a description
+    row('BHCK', '2170', '2001-01-01 00:00:00', end='2024-12-31 00:00:00', name='TOTAL ASSETS'),
+    row('BHCK', '3210', '2001-01-01 00:00:00', description='Now described'),
+    # BHCK 3300 loses its glossary, still without a description
+    row('BHCK', '3300', '2001-01-01 00:00:00', description=None),
+    row('RCFD', '2170', '2024-01-01 00:00:00', name='TOTAL ASSETS'),
+]
+
+
+def changes_by_key(log):
+    return {(r['Mnemonic'], r['Item Code']): (r['Change'], r['Changed Columns']) for _, r in log.iterrows()}
+
+
+def test_diff_releases_reports_added_removed_ended_and_modified(tmp_path):
+    old = load_release(tmp_path, OLD_ROWS, 'old.csv')
+    new = load_release(tmp_path, NEW_ROWS, 'new.csv')
+
+    log = diff_releases(old, new)
+
+    assert changes_by_key(log) == {
+        ('RCFD', '2170'): ('added', ''),
+        ('RCON', '2948'): ('removed', ''),
+        ('BHCK', '2170'): ('ended', 'End Date'),
+        ('BHCK', '3210'): ('modified', 'Description'),
+        ('BHCK', '3300'): ('modified', 'SeriesGlossary'),
+    }
+    assert list(log['Change']) == ['added', 'removed', 'ended', 'modified', 'modified']
+    ended = log[log['Change'] == 'ended'].iloc[0]
+    assert ended['End Date'] == pd.Timestamp('2024-12-31')
+    assert ended['Old End Date'] == pd.Timestamp('9999-12-31')
+    # Removed rows keep their last known values
+    removed = log[log['Change'] == 'removed'].iloc[0]
+    assert removed['Item Name'] == 'TOTAL LIABILITIES'
+
+
+def test_diff_releases_treats_missing_values_as_equal(tmp_path):
+    old = load_release(tmp_path, OLD_ROWS, 'old.csv')
+    new = load_release(tmp_path, OLD_ROWS, 'new.csv')
+
+    assert diff_releases(old, new).empty
+
+
+def test_diff_releases_matches_repeated_keys_in_file_order(tmp_path):
+    rows = [row('RCON', '2170', '2001-01-01 00:00:00', name='FIRST'),
+            row('RCON', '2170', '2001-01-01 00:00:00', name='SECOND')]
+    old = load_release(tmp_path, rows, 'old.csv')
+    new = load_release(tmp_path, rows[:1], 'new.csv')
+
+    log = diff_releases(old, new)
+
+    assert list(log['Change']) == ['removed']
+    assert list(log['Item Name']) == ['SECOND']
+
+
+def test_save_change_log_replaces_the_file_atomically(tmp_path):
+    log = pd.DataFrame({'Change': ['added'], 'Item Code': ['2170']})
+    path = save_change_log(log, 'a' * 64, 'b' * 64, str(tmp_path))
+    assert pd.read_csv(path, dtype=str).to_dict('records') == [{'Change': 'added', 'Item Code': '2170'}]
+
+    class FailingLog:
+        def to_csv(self, path, index):
+            with open(path, 'w') as f:
+                f.write('Change,Item')
+            raise OSError('disk full')
+
+    with pytest.raises(OSError):
+        save_change_log(FailingLog(), 'a' * 64, 'b' * 64, str(tmp_path))
+    # The previous log is untouched and no temporary file is left behind
+    assert pd.read_csv(path, dtype=str).to_dict('records') == [{'Change': 'added', 'Item Code': '2170'}]
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
+
+
+def build(cache_dir):
+    return lambda df: MDRMDataset(df, TABLE_COLUMNS, cache_dir)
+
+
+@pytest.fixture
+def release(tmp_path):
+    """The old release loaded from a CSV that the test then replaces with the new one."""
+    csv_path = str(tmp_path / 'MDRM_CSV.csv')
+    cache_dir = str(tmp_path / 'cache')
+    write_release(csv_path, OLD_ROWS)
+    dataset = build(cache_dir)(load_mdrm(csv_path, cache_dir))
+    return csv_path, cache_dir, dataset
+
+
+def replace_release(csv_path, rows):
+    stat = os.stat(csv_path)
+    write_release(csv_path, rows)
+    # Make sure the change is visible even on coarse-grained file systems
+    os.utime(csv_path, (stat.st_atime, stat.st_mtime + 10))
+
+
+def watcher(release, reloads):
+    csv_path, cache_dir, dataset = release
+    return DatasetWatcher(dataset, build(cache_dir), lambda d, log: reloads.append((d, log)),
+                          csv_path=csv_path, cache_dir=cache_dir, interval=0)
+
+
+def test_reload_loads_saves_and_publishes_the_new_release(release):
+    csv_path, cache_dir, old = release
+    reloads = []
+    leader = watcher(release, reloads)
+    leader.lock = try_lock(os.path.join(cache_dir, LOCK_NAME))
+    replace_release(csv_path, NEW_ROWS)
+
+    leader.poll_csv()
+
+    [(dataset, log)] = reloads
+    assert dataset.version != old.version
+    assert len(dataset.df) == len(NEW_ROWS)
+    assert leader.dataset is dataset
+    assert changes_by_key(log)[('RCON', '2948')] == ('removed', '')
+    assert read_release(cache_dir) == {'version': dataset.version}
+    saved = pd.read_csv(os.path.join(cache_dir, f'changes-{old.version[:16]}-{dataset.version[:16]}.csv'),
+                        dtype={'Item Code': str})
+    assert len(saved) == len(log)
+
+    # Nothing changed since: polling again doesn't reload
+    leader.poll_csv()
+    assert len(reloads) == 1
+
+
+def test_followers_map_the_published_release_without_parsing(release, monkeypatch):
+    csv_path, cache_dir, old = release
+    leader_reloads, follower_reloads = [], []
+    leader = watcher(release, leader_reloads)
+    follower = watcher(release, follower_reloads)
+    leader.lock = try_lock(os.path.join(cache_dir, LOCK_NAME))
+    assert try_lock(os.path.join(cache_dir, LOCK_NAME)) is None
+
+    # Nothing published yet
+    follower.poll_release()
+    assert follower_reloads == []
+
+    replace_release(csv_path, NEW_ROWS)
+    leader.poll_csv()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("followers must not parse the CSV")
+    monkeypatch.setattr('mdrm_dataset.load_mdrm', fail)
+    follower.poll_release()
+
+    [(dataset, log)] = follower_reloads
+    assert dataset.version == leader.dataset.version
+    pd.testing.assert_frame_equal(log, leader_reloads[0][1])
+
+
+def test_lock_passes_on_when_the_holder_exits(tmp_path):
+    path = str(tmp_path / LOCK_NAME)
+    first = try_lock(path)
+    assert first is not None
+    assert try_lock(path) is None
+    first.close()
+    second = try_lock(path)
+    assert second is not None
+    second.close()
@@ -0,0 +1,70 @@
+"""Tests for the DataTable filter parser and TableStore filtering in mdrm_table."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mdrm_table import TableStore, parse_filter_query
+
+OPERATOR_FORMS = [
+    ('eq', '='), ('ne', '!='), ('lt', '<'), ('le', '<='), ('gt', '>'), ('ge', '>='),
+]
+
+
+@pytest.mark.parametrize('name, symbol', OPERATOR_FORMS)
+@pytest.mark.parametrize('prefix, case_sensitive', [('', True), ('s', True), ('i', False)])
+def test_parse_filter_query_accepts_every_relational_form(name, symbol, prefix, case_sensitive):
+    for operator in (prefix + name, prefix + symbol):
+        assert parse_filter_query(f'{{Mnemonic}} {operator} RCON') == [('Mnemonic', name, 'RCON', case_sensitive)]
+
+
+@pytest.mark.parametrize('name', ['contains', 'datestartswith'])
+@pytest.mark.parametrize('prefix, case_sensitive', [('', True), ('s', True), ('i', False)])
+def test_parse_filter_query_accepts_every_text_form(name, prefix, case_sensitive):
+    assert parse_filter_query(f'{{Item Name}} {prefix}{name} "total assets"') == [
+        ('Item Name', name, 'total assets', case_sensitive)]
+
+
+def test_parse_filter_query_splits_clauses_and_skips_unknown_operators():
+    query = '{Mnemonic} s= RCON && {Item Code} like 21 && {Start Date} datestartswith 2001'
+    assert parse_filter_query(query) == [('Mnemonic', 'eq', 'RCON', True),
+                                         ('Start Date', 'datestartswith', '2001', True)]
+    assert parse_filter_query('') == []
+    assert parse_filter_query(None) == []
+
+
+@pytest.fixture
+def store():
+    df = pd.DataFrame({
+        'Mnemonic': ['RCON', 'rcon', 'BHCK', 'RCFD', None],
+        'Item Code': ['2170', '2170', '2948', '3210', '4000'],
+        'Start Date': pd.to_datetime(['2001-01-01', '2001-06-30', '2010-03-31', '2020-01-01', '2024-01-01']),
+    })
+    return TableStore(df, ['Mnemonic', 'Item Code', 'Start Date'])
+
+
+def filtered(store, query):
+    return list(store.filter(np.arange(5), query))
+
+
+@pytest.mark.parametrize('query, rows', [
+    ('{Mnemonic} = RCON', [0]),
+    ('{Mnemonic} eq RCON', [0]),
+    ('{Mnemonic} s= RCON', [0]),
+    ('{Mnemonic} seq RCON', [0]),
+    ('{Mnemonic} i= rcon', [0, 1]),
+    ('{Mnemonic} ieq RCON', [0, 1]),
+    ('{Mnemonic} != RCON', [1, 2, 3]),
+    ('{Mnemonic} i!= rcon', [2, 3]),
+    ('{Item Code} < 2948', [0, 1]),
+    ('{Item Code} s<= 2948', [0, 1, 2]),
+    ('{Item Code} i> 2948', [3, 4]),
+    ('{Item Code} sge 3210', [3, 4]),
+    ('{Mnemonic} contains RC', [0, 3]),
+    ('{Mnemonic} icontains rc', [0, 1, 3]),
+    ('{Start Date} datestartswith 2001', [0, 1]),
+    ('{Start Date} datestartswith 2001 && {Mnemonic} s= RCON', [0]),
+    ('{Unknown} = RCON', [0, 1, 2, 3, 4]),
+])
+def test_table_store_filter(store, query, rows):
+    assert filtered(store, query) == rows
@@ -0,0 +1,10 @@
+"""
+WSGI entry point for serving the MDRM Explorer in production.
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+"""
+
+from mdrm_explorer import create_app
+
+app = create_app()
+application = app.server